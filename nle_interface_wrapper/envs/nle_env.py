@@ -4,6 +4,7 @@ from gymnasium import registry
 from nle import nethack
 
 from nle_interface_wrapper.wrappers import (
+    AddTextIntrinsics,
     AddTextInventory,
     AddTextMap,
     AddTextOverview,
@@ -16,7 +17,11 @@ from nle_interface_wrapper.wrappers import (
     NoProgressAbort,
     PlayNLE,
     Properties,
+    RecordTrajectory,
+    RenderRGBArray,
+    RollingHistory,
 )
+from nle_interface_wrapper.wrappers.reset_cache import ResetCache
 
 NETHACK_ENVS = [env_spec.id for env_spec in registry.values() if "NetHack" in env_spec.id]
 
@@ -69,19 +74,37 @@ def create_env(env_name, cfg, env_config, render_mode=None):
             kwargs[param_name] = param_value
 
     env = gym.make(env_name, render_mode=render_mode, **kwargs)
+    env = RenderRGBArray(env)
     env = AutoRender(env)
     env = AutoSeed(env)
-    env = NoProgressAbort(env)
+    env = NoProgressAbort(env, loop_window=getattr(cfg, "loop_window", None))
     env = AutoMore(env)
 
+    # options added after the original Args default to the old behaviour for configs which don't have them
+    if getattr(cfg, "reset_cache", False):
+        reset_cache = ResetCache(validate=getattr(cfg, "validate_reset_cache", False))
+    else:
+        reset_cache = None
+
     env = Properties(env)
-    env = AddTextOverview(env)
-    env = AddTextMap(env)
+    env = AddTextOverview(env, reset_cache=reset_cache)
+    env = AddTextMap(env, reset_cache=reset_cache)
     env = AddTextInventory(env)
-    env = AddTextSpells(env)
-    env = AddTextSkills(env)
+    env = AddTextSpells(env, reset_cache=reset_cache)
+    env = AddTextSkills(env, reset_cache=reset_cache)
     env = AddTextPrayer(env)
 
+    if getattr(cfg, "text_intrinsics", False):
+        env = AddTextIntrinsics(env)
+
+    history_size = getattr(cfg, "history_size", None)
+    if history_size is not None:
+        env = RollingHistory(env, history_size=history_size, add_obs=getattr(cfg, "history_obs", False))
+
+    record_dir = getattr(cfg, "record_dir", None)
+    if record_dir is not None:
+        env = RecordTrajectory(env, record_dir)
+
     env = PlayNLE(env)
 
     return env
@@ -21,11 +21,18 @@ class Args:
     reward_shaping_coefficient: float = 0.1
     fn_penalty_step: Literal["constant", "exp", "square", "linear", "always"] = "constant"
     max_episode_steps: Optional[int] = 100_000
+    loop_window: Optional[int] = None
     allow_all_yn_questions: bool = True
     allow_all_modes: bool = True
     savedir: Optional[str] = None
     save_ttyrec_every: Optional[int] = 0
+    record_dir: Optional[str] = None
+    history_size: Optional[int] = None
+    history_obs: bool = False
+    text_intrinsics: bool = False
     seed: Optional[int] = None
+    reset_cache: bool = False
+    validate_reset_cache: bool = False
     render_mode: Optional[Literal["human", "rgb_array"]] = "human"
 
 
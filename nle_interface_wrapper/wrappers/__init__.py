@@ -1,6 +1,8 @@
 from nle_interface_wrapper.wrappers.auto_more import AutoMore
 from nle_interface_wrapper.wrappers.auto_render import AutoRender
 from nle_interface_wrapper.wrappers.auto_seed import AutoSeed
+from nle_interface_wrapper.wrappers.history import RollingHistory
+from nle_interface_wrapper.wrappers.intrinsics import AddTextIntrinsics
 from nle_interface_wrapper.wrappers.inventory import AddTextInventory
 from nle_interface_wrapper.wrappers.map import AddTextMap
 from nle_interface_wrapper.wrappers.no_progress_abort import NoProgressAbort
@@ -8,5 +10,7 @@ from nle_interface_wrapper.wrappers.overview import AddTextOverview
 from nle_interface_wrapper.wrappers.play_nle import PlayNLE
 from nle_interface_wrapper.wrappers.prayer import AddTextPrayer
 from nle_interface_wrapper.wrappers.properties import Properties
+from nle_interface_wrapper.wrappers.record_trajectory import RecordTrajectory
+from nle_interface_wrapper.wrappers.render_rgb import RenderRGBArray
 from nle_interface_wrapper.wrappers.skills import AddTextSkills
 from nle_interface_wrapper.wrappers.spells import AddTextSpells
@@ -109,7 +109,9 @@ class AutoMore(gym.Wrapper):
         return "\n".join(result)
 
     def render(self, mode="human", **kwargs):
-        if mode == "human":
+        if self.render_mode == "rgb_array":
+            return self.env.render()
+        elif mode == "human":
             print(self.last_text_message)
             env = self.env.unwrapped
             obs = env.last_observation
@@ -0,0 +1,138 @@
+from typing import Optional, Tuple
+
+import gymnasium as gym
+import numpy as np
+
+from nle_interface_wrapper.wrappers.properties.blstats import BLSTATS_FIELDS, BLStats
+
+
+class RingBuffer:
+    """
+    Preallocated buffer keeping the last `capacity` rows, append is O(1) and never allocates.
+    Windows are the last n rows (all rows when n is None), oldest first.
+    """
+
+    def __init__(self, capacity: int, shape: Tuple[int, ...] = (), dtype=np.int64):
+        self.capacity = capacity
+        self.data = np.zeros((capacity, *shape), dtype)
+        self.start = 0
+        self.size = 0
+
+    def clear(self):
+        self.start = 0
+        self.size = 0
+
+    def append(self, row):
+        self.data[(self.start + self.size) % self.capacity] = row
+        if self.size < self.capacity:
+            self.size += 1
+        else:
+            self.start = (self.start + 1) % self.capacity
+
+    def __len__(self) -> int:
+        return self.size
+
+    def window(self, n: Optional[int] = None) -> np.ndarray:
+        n = self.size if n is None else min(n, self.size)
+        first = self.start + self.size - n
+        indices = np.arange(first, first + n) % self.capacity
+        return self.data[indices]
+
+    def last(self) -> np.ndarray:
+        assert self.size > 0, "empty buffer"
+        return self.data[(self.start + self.size - 1) % self.capacity]
+
+    def min(self, n: Optional[int] = None) -> np.ndarray:
+        return self.window(n).min(axis=0)
+
+    def max(self, n: Optional[int] = None) -> np.ndarray:
+        return self.window(n).max(axis=0)
+
+    def mean(self, n: Optional[int] = None) -> np.ndarray:
+        return self.window(n).mean(axis=0)
+
+    def delta(self, n: Optional[int] = None) -> np.ndarray:
+        """
+        Newest minus oldest row of the window.
+        """
+        window = self.window(n)
+        return window[-1] - window[0]
+
+    def padded(self) -> np.ndarray:
+        """
+        All `capacity` rows oldest first, rows which weren't written yet are zeros at the front.
+        """
+        padded = np.zeros_like(self.data)
+        if self.size > 0:
+            padded[-self.size :] = self.window()
+        return padded
+
+
+class RollingHistory(gym.Wrapper):
+    """
+    Keeps the blstats and player positions of the last `history_size` steps in ring buffers.
+
+    Windowed statistics are available through field_window, field_min, ... e.g. field_delta("hitpoints", 20).
+    With `add_obs` the histories are added to the observation as fixed-size arrays (oldest first, zero padded)
+    "history_blstats" and "history_positions", with the number of valid rows in "history_length".
+    """
+
+    def __init__(self, env, history_size: int = 100, add_obs: bool = False):
+        super().__init__(env)
+        self.history_size = history_size
+        self.add_obs = add_obs
+        self.blstats_history = RingBuffer(history_size, (len(BLSTATS_FIELDS),))
+        self.position_history = RingBuffer(history_size, (2,))
+
+    def reset(self, **kwargs):
+        obs, info = self.env.reset(**kwargs)
+
+        self.blstats_history.clear()
+        self.position_history.clear()
+        self.update()
+
+        return self.populate_obs(obs), info
+
+    def step(self, action):
+        obs, reward, terminated, truncated, info = self.env.step(action)
+
+        self.update()
+
+        return self.populate_obs(obs), reward, terminated, truncated, info
+
+    def update(self):
+        blstats: BLStats = self.env.get_wrapper_attr("blstats")
+        self.blstats_history.append(blstats.array)
+        self.position_history.append((blstats.y, blstats.x))
+
+    def populate_obs(self, obs):
+        if not self.add_obs:
+            return obs
+        return {
+            **obs,
+            "history_blstats": self.blstats_history.padded(),
+            "history_positions": self.position_history.padded(),
+            "history_length": len(self.blstats_history),
+        }
+
+    def field_window(self, field: str, n: Optional[int] = None) -> np.ndarray:
+        return self.blstats_history.window(n)[:, BLSTATS_FIELDS.index(field)]
+
+    def field_min(self, field: str, n: Optional[int] = None):
+        return self.field_window(field, n).min()
+
+    def field_max(self, field: str, n: Optional[int] = None):
+        return self.field_window(field, n).max()
+
+    def field_mean(self, field: str, n: Optional[int] = None):
+        return self.field_window(field, n).mean()
+
+    def field_delta(self, field: str, n: Optional[int] = None):
+        window = self.field_window(field, n)
+        return window[-1] - window[0]
+
+    def visited(self, n: Optional[int] = None) -> np.ndarray:
+        """
+        Distinct (y, x) positions of the last n steps.
+        """
+        return np.unique(self.position_history.window(n), axis=0)
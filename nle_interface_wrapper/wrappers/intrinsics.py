@@ -0,0 +1,25 @@
+import gymnasium as gym
+
+
+class AddTextIntrinsics(gym.Wrapper):
+    def __init__(self, env):
+        super().__init__(env)
+
+    def reset(self, **kwargs):
+        obs, info = self.env.reset(**kwargs)
+
+        return self.populate_obs(obs), info
+
+    def step(self, action):
+        obs, reward, terminated, truncated, info = self.env.step(action)
+
+        return self.populate_obs(obs), reward, terminated, truncated, info
+
+    def populate_obs(self, obs):
+        return {**obs, "text_intrinsics": str(self)}
+
+    def __str__(self):
+        return str(self.intrinsics)
+
+    def __repr__(self):
+        return self.__str__()
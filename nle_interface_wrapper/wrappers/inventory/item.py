@@ -18,6 +18,7 @@ from nle_interface_wrapper.wrappers.inventory.properties import (
     ToolClass,
     WeaponClass,
 )
+from nle_interface_wrapper.wrappers.properties.monster import MONSTER_NAMES, MONSTERS, PERMONST, PERMONST_TO_MON_ID
 
 
 class Item:
@@ -37,7 +38,6 @@ class Item:
         self,
         name: str,
         named: str,
-        permonst,
         item_category: ItemCategory,
         quantity: ItemQuantity,
         beatitude: ItemBeatitude,
@@ -47,10 +47,15 @@ class Item:
         shop_price: ShopPrice,
         equipped: bool,
         at_ready: bool,
+        permonst=None,
+        mon_id: Optional[int] = None,
     ):
         self._name = name
         self.named = named
-        self.permonst = permonst
+        # permonst is kept for callers which pass nle's permonst, the item only stores its mon id
+        if mon_id is None and permonst is not None:
+            mon_id = PERMONST_TO_MON_ID[(permonst.mname, permonst.mlet)]
+        self.mon_id = mon_id
         self.item_category = item_category if item_category else self.item_class.item_category
 
         self.quantity = quantity
@@ -63,6 +68,11 @@ class Item:
         self.equipped = equipped
         self.at_ready = at_ready
 
+    @property
+    def permonst(self):
+        if self.mon_id is not None:
+            return PERMONST[self.mon_id]
+
     @property
     def name(self):
         if self.is_identified:
@@ -79,7 +89,7 @@ class Item:
         text.append(str(self.enchantment))
 
         if self.item_category in [ItemCategory.CORPSE, ItemCategory.STATUE]:
-            text.append(f"{self.permonst.mname} {self.name}")
+            text.append(f"{MONSTER_NAMES[self.mon_id]} {self.name}")
         else:
             text.append(self.name)
 
@@ -205,7 +215,7 @@ class Item:
             if globby:
                 nut = self.weight
             else:
-                nut = self.permonst.cnutrit
+                nut = MONSTERS["cnutrit"][self.mon_id]
         else:
             nut = self.object.oc_nutrition
 
@@ -292,7 +302,7 @@ class Item:
                 else:
                     return 100
             else:
-                return self.quantity.value * self.permonst.cwt
+                return self.quantity.value * MONSTERS["cwt"][self.mon_id]
             # NOTE: we ignore partly eaten
 
         # coin
@@ -2,7 +2,7 @@ import re
 
 import inflect
 
-from nle_interface_wrapper.wrappers.inventory.objects import name_to_monsters, scrolls
+from nle_interface_wrapper.wrappers.inventory.objects import scrolls
 from nle_interface_wrapper.wrappers.inventory.properties import (
     ItemBeatitude,
     ItemCategory,
@@ -12,6 +12,7 @@ from nle_interface_wrapper.wrappers.inventory.properties import (
     ShopPrice,
     ShopStatus,
 )
+from nle_interface_wrapper.wrappers.properties.monster import NAME_TO_MON_ID
 
 p = inflect.engine()
 
@@ -134,7 +135,7 @@ class ItemParser:
             "enchantment": ItemEnchantment.from_str(item_info["enchantment"]),
             "shop_status": ShopStatus.from_str(item_info["shop_status"]),
             "shop_price": ShopPrice.from_str(item_info["shop_price"]),
-            "permonst": None,
+            "mon_id": None,
             "item_category": None,
         }
 
@@ -214,7 +215,7 @@ class ItemParser:
         name = name.removesuffix(" corpse")
         name = name.removeprefix("an ")
         name = name.removeprefix("a ")
-        parsed_item.update({"permonst": name_to_monsters[name], "item_category": ItemCategory.CORPSE, "name": "corpse"})
+        parsed_item.update({"mon_id": NAME_TO_MON_ID[name], "item_category": ItemCategory.CORPSE, "name": "corpse"})
 
     def _handle_ooze(self, parsed_item):
         """Handle ooze"""
@@ -223,7 +224,7 @@ class ItemParser:
         parts = name.split("glob of ")
         assert len(parts) == 2
         name = "glob of " + parts[1]
-        parsed_item.update({"permonst": name_to_monsters[parts[1]], "item_category": ItemCategory.CORPSE, "name": name})
+        parsed_item.update({"mon_id": NAME_TO_MON_ID[parts[1]], "item_category": ItemCategory.CORPSE, "name": name})
 
     def _handle_statue(self, parsed_item):
         """Handle statue items"""
@@ -233,7 +234,7 @@ class ItemParser:
         name = name.removeprefix("statue of ")
         name = name.removeprefix("an ")
         name = name.removeprefix("a ")
-        parsed_item.update({"permonst": name_to_monsters[name], "item_category": ItemCategory.STATUE, "name": "statue"})
+        parsed_item.update({"mon_id": NAME_TO_MON_ID[name], "item_category": ItemCategory.STATUE, "name": "statue"})
 
     def _handle_figurine(self, parsed_item):
         """Handle figurine items"""
@@ -242,7 +243,7 @@ class ItemParser:
         name = name.removeprefix("figurine of ")
         name = name.removeprefix("an ")
         name = name.removeprefix("a ")
-        parsed_item.update({"permonst": name_to_monsters[name], "name": "figurine"})
+        parsed_item.update({"mon_id": NAME_TO_MON_ID[name], "name": "figurine"})
 
     def _handle_tin(self, parsed_item):
         """Handle tin items"""
@@ -251,7 +252,7 @@ class ItemParser:
         name = name.removeprefix("tin of ")
         if "meat" in name:
             name = name.removesuffix(" meat")
-            parsed_item["permonst"] = name_to_monsters[name]
+            parsed_item["mon_id"] = NAME_TO_MON_ID[name]
         parsed_item["name"] = "tin"
 
     def _handle_egg(self, parsed_item):
@@ -260,7 +261,7 @@ class ItemParser:
         name = self._make_singular(name)
         name = name.removeprefix("an ")
         name = name.removeprefix("a ")
-        parsed_item.update({"permonst": name_to_monsters[name], "name": "egg"})
+        parsed_item.update({"mon_id": NAME_TO_MON_ID[name], "name": "egg"})
 
     def _matches_any_suffix(self, name, suffixes):
         """Helper method to check if name starts/ends with any of the given suffixes"""
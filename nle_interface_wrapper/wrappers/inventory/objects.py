@@ -261,12 +261,6 @@ for novel in novels:
 scrolls = [name.removeprefix("scroll labeled ") for name in NAME_TO_OBJECTS.keys() if "scroll labeled" in name]
 
 
-name_to_monsters = {}
-for glyph in range(nh.GLYPH_MON_OFF, nh.GLYPH_MON_OFF + nh.NUMMONS):
-    permonst = nh.permonst(glyph)
-    name_to_monsters[permonst.mname] = permonst
-
-
 NAME_TO_GLYPHS = {key: [glyph for obj, glyph in inner] for key, inner in NAME_TO_OBJECTS.items()}
 
 NAME_TO_OBJECTS = {key: [obj for obj, glyph in inner] for key, inner in NAME_TO_OBJECTS.items()}
@@ -0,0 +1,118 @@
+from typing import Optional, Tuple
+
+import numba as nb
+import numpy as np
+from numpy import ndarray
+
+from nle_interface_wrapper.wrappers.map.level import Level
+from nle_interface_wrapper.wrappers.properties.category import GC, has
+from nle_interface_wrapper.wrappers.properties.spatial import NEIGHBORS, distance_field
+
+
+@nb.njit("void(b1[:,:],b1[:,:],i4[:,:],i8[:,:],i8[:,:])", cache=True)
+def _relax_kernel(walkable, doors, dist, seeds, neighbors):
+    """
+    Lowers the distances of dist after cells became walkable (or stopped being doors), starting from the seeds.
+    Moves have unit cost, so a FIFO queue settles every cell after a few passes.
+    """
+    height, width = walkable.shape
+    size = walkable.size
+    # ring buffer, every cell is queued at most once at a time
+    queue = np.empty((size, 2), dtype=nb.i8)
+    queued = np.zeros(walkable.shape, dtype=nb.b1)
+    head = 0
+    tail = 0
+
+    # seeds take the best distance of their neighbors
+    for k in range(seeds.shape[0]):
+        y = seeds[k, 0]
+        x = seeds[k, 1]
+        if not walkable[y, x]:
+            continue
+        for i in range(neighbors.shape[0]):
+            ny = y + neighbors[i, 0]
+            nx = x + neighbors[i, 1]
+            if ny < 0 or ny >= height or nx < 0 or nx >= width or dist[ny, nx] < 0:
+                continue
+            if neighbors[i, 0] != 0 and neighbors[i, 1] != 0 and (doors[y, x] or doors[ny, nx]):
+                continue
+            if dist[y, x] < 0 or dist[ny, nx] + 1 < dist[y, x]:
+                dist[y, x] = dist[ny, nx] + 1
+        if dist[y, x] >= 0 and not queued[y, x]:
+            queued[y, x] = True
+            queue[tail % size, 0] = y
+            queue[tail % size, 1] = x
+            tail += 1
+
+    while head < tail:
+        cy = queue[head % size, 0]
+        cx = queue[head % size, 1]
+        queued[cy, cx] = False
+        head += 1
+        for i in range(neighbors.shape[0]):
+            ny = cy + neighbors[i, 0]
+            nx = cx + neighbors[i, 1]
+            if ny < 0 or ny >= height or nx < 0 or nx >= width or not walkable[ny, nx]:
+                continue
+            if neighbors[i, 0] != 0 and neighbors[i, 1] != 0 and (doors[cy, cx] or doors[ny, nx]):
+                continue
+            if dist[ny, nx] < 0 or dist[cy, cx] + 1 < dist[ny, nx]:
+                dist[ny, nx] = dist[cy, cx] + 1
+                if not queued[ny, nx]:
+                    queued[ny, nx] = True
+                    queue[tail % size, 0] = ny
+                    queue[tail % size, 1] = nx
+                    tail += 1
+
+
+class LevelDistances:
+    """
+    Walking distance field from the player over Level.walkable (8-connected, no diagonal moves through open doors),
+    -1 for cells which can't be reached.
+
+    The field is cached for the player position. When the player stays and cells only become walkable, the cached
+    field is relaxed from the new cells, any other change of the walkable cells or doors computes it again.
+    """
+
+    def __init__(self):
+        self.origin: Optional[Tuple[int, int]] = None
+        self.field: Optional[ndarray] = None
+        self.walkable: Optional[ndarray] = None
+        self.doors: Optional[ndarray] = None
+        self.hits = 0
+        self.incremental = 0
+        self.full = 0
+
+    def get(self, level: Level, origin: Tuple[int, int]) -> ndarray:
+        origin = (int(origin[0]), int(origin[1]))
+        walkable = level.walkable.copy()
+        # the player may stand on a cell which isn't walkable otherwise (e.g. a closed door)
+        walkable[origin] = True
+        doors = has(level.object_categories, GC.DOOR_OPENED)
+
+        if origin != self.origin or self.field is None:
+            self.compute(walkable, doors, origin)
+            return self.field
+
+        removed = (self.walkable & ~walkable) | (doors & ~self.doors)
+        if removed.any():
+            self.compute(walkable, doors, origin)
+            return self.field
+
+        added = (walkable & ~self.walkable) | (self.doors & ~doors)
+        if not added.any():
+            self.hits += 1
+            return self.field
+
+        _relax_kernel(walkable, doors, self.field, np.argwhere(added), NEIGHBORS)
+        self.walkable = walkable
+        self.doors = doors
+        self.incremental += 1
+        return self.field
+
+    def compute(self, walkable: ndarray, doors: ndarray, origin: Tuple[int, int]):
+        self.field = distance_field(walkable, doors, origin)
+        self.walkable = walkable
+        self.doors = doors
+        self.origin = origin
+        self.full += 1
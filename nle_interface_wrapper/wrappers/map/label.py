@@ -1,12 +1,11 @@
-import itertools
-from typing import Tuple
+from typing import Optional, Tuple
 
+import numba as nb
 import numpy as np
 from PIL import Image
 from scipy import ndimage
 
-from nle_interface_wrapper.wrappers.properties.glyph import SS, G
-from nle_interface_wrapper.wrappers.properties.utils import isin
+from nle_interface_wrapper.wrappers.properties.category import GC, has
 
 
 def print_boolean_array_ascii(arr):
@@ -59,6 +58,39 @@ def save_boolean_array_pillow(arr):
         print(f"Error saving image: {e}")
 
 
+@nb.njit("void(i2[:,:],b1[:,:],i8,b1[:,:],b1[:,:])", cache=True)
+def _gap_fill_kernel(labeled_features, walkable, num_rooms, rooms, corridors):
+    """
+    Walkable unlabeled cells join the rooms if all their labeled neighbors are rooms, else the corridors.
+    Cells without labeled neighbors stay unlabeled. Votes only read the labels passed in.
+    """
+    height, width = labeled_features.shape
+    for y in range(height):
+        for x in range(width):
+            if not walkable[y, x] or labeled_features[y, x] != 0:
+                continue
+            any_neighbor = False
+            all_rooms = True
+            for dy in range(-1, 2):
+                for dx in range(-1, 2):
+                    if dy == 0 and dx == 0:
+                        continue
+                    ny = y + dy
+                    nx = x + dx
+                    if ny < 0 or ny >= height or nx < 0 or nx >= width:
+                        continue
+                    neighbor = labeled_features[ny, nx]
+                    if neighbor != 0:
+                        any_neighbor = True
+                        if neighbor > num_rooms:
+                            all_rooms = False
+            if any_neighbor:
+                if all_rooms:
+                    rooms[y, x] = True
+                else:
+                    corridors[y, x] = True
+
+
 def label_dungeon_features(glyphs, level):
     """
     Labels the dungeon features (rooms, corridors, and doors) in the current level of the bot.
@@ -73,51 +105,24 @@ def label_dungeon_features(glyphs, level):
     structure = ndimage.generate_binary_structure(2, 1)
 
     # rooms
-    room_floor = frozenset({SS.S_room, SS.S_darkroom})
-    rooms = isin(level.objects, room_floor)
+    rooms = has(level.object_categories, GC.ROOM_FLOOR)
     labeled_rooms, num_rooms = ndimage.label(rooms, structure=structure)
 
     # corridors
-    corridor_floor = frozenset({SS.S_corr, SS.S_litcorr})
-    corridors = isin(level.objects, corridor_floor)
+    corridors = has(level.object_categories, GC.CORRIDOR)
     labeled_corridors, num_corridors = ndimage.label(corridors, structure=structure)
 
     # doors
-    doors = isin(level.objects, frozenset({SS.S_ndoor}), G.DOOR_OPENED)
+    doors = has(level.object_categories, GC.NO_DOOR | GC.DOOR_OPENED)
 
     # combine rooms and corridors
     labeled_features = np.zeros_like(level.objects)
     labeled_features[rooms] = labeled_rooms[rooms]
     labeled_features[corridors] = labeled_corridors[corridors] + num_rooms
 
-    def label_walkable_features(position):
-        # if all neighbors which are dungeon features have the same label
-        neighbors = []
-        height, width = glyphs.shape
-        for x, y in itertools.product([-1, 0, 1], repeat=2):
-            if x == 0 and y == 0:
-                continue
-
-            # make sure we don't have out of bounds
-            if not (0 <= position[0] + y < height) or not (0 <= position[1] + x < width):
-                continue
-
-            neighbor = labeled_features[position[0] + y, position[1] + x]
-            if neighbor != 0:
-                neighbors.append(neighbor)
-        neighbors = np.array(neighbors)
-
-        if len(neighbors) > 0:
-            # if all neighbors are rooms or corridors
-            if np.all(neighbors <= num_rooms):
-                rooms[position] = True
-            else:
-                corridors[position] = True
-
     # missing features (items, corpses, monsters, chests, etc.)
     # this includes our position
-    for p in np.argwhere(np.logical_and(level.walkable, labeled_features == 0)):
-        label_walkable_features(tuple(p))
+    _gap_fill_kernel(labeled_features, level.walkable, num_rooms, rooms, corridors)
 
     # we include doors only at the end to be able to detect if we are standing on the door, overall we treat doors as part of the corridor
     corridors[doors] = True
@@ -132,23 +137,224 @@ def label_dungeon_features(glyphs, level):
     return labeled_features, num_rooms, num_corridors
 
 
-def room_detection(glyphs, level) -> Tuple[np.ndarray, int]:
-    labeled_features, num_rooms, num_corridors = label_dungeon_features(glyphs, level)
-    labeled_features[labeled_features > num_rooms] = 0
+@nb.njit("void(b1[:,:],b1[:,:],b1[:,:],b1[:,:],i8[:],i8[:],b1[:,:],b1[:,:])", cache=True)
+def _membership_kernel(room_floor, corridor_floor, doors, walkable, ys, xs, rooms, corridors):
+    """
+    Final room / corridor membership of the given cells, the same rules as label_dungeon_features.
+    """
+    height, width = room_floor.shape
+    for i in range(ys.shape[0]):
+        y = ys[i]
+        x = xs[i]
+        room = room_floor[y, x]
+        corridor = corridor_floor[y, x]
+        if walkable[y, x] and not room and not corridor:
+            # vote of the labeled neighbors
+            any_neighbor = False
+            all_rooms = True
+            for dy in range(-1, 2):
+                for dx in range(-1, 2):
+                    if dy == 0 and dx == 0:
+                        continue
+                    ny = y + dy
+                    nx = x + dx
+                    if ny < 0 or ny >= height or nx < 0 or nx >= width:
+                        continue
+                    if corridor_floor[ny, nx]:
+                        any_neighbor = True
+                        all_rooms = False
+                    elif room_floor[ny, nx]:
+                        any_neighbor = True
+            if any_neighbor:
+                room = all_rooms
+                corridor = not all_rooms
+        rooms[y, x] = room and not doors[y, x]
+        corridors[y, x] = corridor or doors[y, x]
+
+
+@nb.njit(cache=True)
+def _find(parent, i):
+    root = i
+    while parent[root] != root:
+        root = parent[root]
+    while parent[i] != root:
+        parent[i], i = root, parent[i]
+    return root
+
+
+@nb.njit(cache=True)
+def _union(parent, a, b):
+    ra = _find(parent, a)
+    rb = _find(parent, b)
+    if ra != rb:
+        if ra < rb:
+            parent[rb] = ra
+        else:
+            parent[ra] = rb
+
+
+@nb.njit("void(i4[:],b1[:,:])", cache=True)
+def _union_find_kernel(parent, mask):
+    """
+    Builds the union-find forest of the 4-connected components of mask from scratch.
+    """
+    height, width = mask.shape
+    for y in range(height):
+        for x in range(width):
+            i = y * width + x
+            parent[i] = i
+            if not mask[y, x]:
+                continue
+            if y > 0 and mask[y - 1, x]:
+                _union(parent, i, i - width)
+            if x > 0 and mask[y, x - 1]:
+                _union(parent, i, i - 1)
+
+
+@nb.njit("void(i4[:],b1[:,:],i8[:],i8[:])", cache=True)
+def _add_cells_kernel(parent, mask, ys, xs):
+    """
+    Joins cells which were added to mask to their 4-connected neighbors.
+    """
+    height, width = mask.shape
+    for k in range(ys.shape[0]):
+        y = ys[k]
+        x = xs[k]
+        i = y * width + x
+        parent[i] = i
+    for k in range(ys.shape[0]):
+        y = ys[k]
+        x = xs[k]
+        i = y * width + x
+        if y > 0 and mask[y - 1, x]:
+            _union(parent, i, i - width)
+        if y < height - 1 and mask[y + 1, x]:
+            _union(parent, i, i + width)
+        if x > 0 and mask[y, x - 1]:
+            _union(parent, i, i - 1)
+        if x < width - 1 and mask[y, x + 1]:
+            _union(parent, i, i + 1)
+
+
+@nb.njit("i8(i4[:],b1[:,:],i2[:,:],i2)", cache=True)
+def _label_kernel(parent, mask, labels, offset):
+    """
+    Writes component labels (+ offset) of mask in raster order of the components' first cells, like ndimage.label.
+    """
+    height, width = mask.shape
+    root_label = np.zeros(parent.shape[0], dtype=nb.i8)
+    num = 0
+    for y in range(height):
+        for x in range(width):
+            if not mask[y, x]:
+                continue
+            root = _find(parent, y * width + x)
+            if root_label[root] == 0:
+                num += 1
+                root_label[root] = num
+            labels[y, x] = root_label[root] + offset
+    return num
+
+
+class IncrementalLabeler:
+    """
+    Room and corridor labels of one level, kept up to date from the cells Level.update marks dirty.
+
+    Membership is a function of a cell and its 8 neighbors, so only dirty cells and their neighbors are
+    reclassified. Added cells are joined into the union-find forests, when a cell leaves a mask its component
+    may split and that mask is rebuilt. Labels match label_dungeon_features.
+    """
+
+    def __init__(self, shape: Tuple[int, int]):
+        size = shape[0] * shape[1]
+        self.rooms = np.zeros(shape, bool)
+        self.corridors = np.zeros(shape, bool)
+        self.room_parent = np.arange(size, dtype=np.int32)
+        self.corridor_parent = np.arange(size, dtype=np.int32)
+        self.initialized = False
+        self.full_relabels = 0
+
+    def update(self, level) -> "LabeledFeatures":
+        room_floor = has(level.object_categories, GC.ROOM_FLOOR)
+        corridor_floor = has(level.object_categories, GC.CORRIDOR)
+        doors = has(level.object_categories, GC.NO_DOOR | GC.DOOR_OPENED)
+
+        dirty = level.pop_dirty()
+        if not self.initialized:
+            dirty[:] = True
+        else:
+            dirty = ndimage.binary_dilation(dirty, structure=np.ones((3, 3), bool))
+        ys, xs = np.nonzero(dirty)
+
+        rooms = self.rooms.copy()
+        corridors = self.corridors.copy()
+        _membership_kernel(room_floor, corridor_floor, doors, level.walkable, ys, xs, rooms, corridors)
+
+        self.update_mask(self.rooms, rooms, self.room_parent)
+        self.update_mask(self.corridors, corridors, self.corridor_parent)
+        self.initialized = True
+
+        labeled_features = np.zeros(rooms.shape, np.int16)
+        num_rooms = _label_kernel(self.room_parent, self.rooms, labeled_features, 0)
+        num_corridors = _label_kernel(self.corridor_parent, self.corridors, labeled_features, num_rooms)
+        return LabeledFeatures(labeled_features, num_rooms, num_corridors)
+
+    def update_mask(self, mask: np.ndarray, new_mask: np.ndarray, parent: np.ndarray):
+        if not self.initialized or (mask & ~new_mask).any():
+            mask[:] = new_mask
+            _union_find_kernel(parent, mask)
+            self.full_relabels += 1
+            return
+
+        added_ys, added_xs = np.nonzero(new_mask & ~mask)
+        mask[:] = new_mask
+        _add_cells_kernel(parent, mask, added_ys, added_xs)
+
+
+class LabeledFeatures:
+    """
+    Result of label_dungeon_features for one step, rooms are labels 1..num_rooms and corridors the labels after.
+    The room and corridor views are derived from it on first use, so all entry points share a single labeling.
+    """
+
+    def __init__(self, labeled_features: np.ndarray, num_rooms: int, num_corridors: int):
+        self.labeled_features = labeled_features
+        self.num_rooms = num_rooms
+        self.num_corridors = num_corridors
+        self._rooms = None
+        self._corridors = None
+
+    @classmethod
+    def compute(cls, glyphs, level) -> "LabeledFeatures":
+        return cls(*label_dungeon_features(glyphs, level))
+
+    @property
+    def rooms(self) -> np.ndarray:
+        if self._rooms is None:
+            self._rooms = np.where(self.labeled_features > self.num_rooms, 0, self.labeled_features)
+        return self._rooms
 
-    return labeled_features, num_rooms
+    @property
+    def corridors(self) -> np.ndarray:
+        if self._corridors is None:
+            corridors = self.labeled_features > self.num_rooms
+            self._corridors = np.where(corridors, self.labeled_features - self.num_rooms, 0)
+        return self._corridors
 
 
-def corridor_detection(glyphs, level) -> Tuple[np.ndarray, int]:
-    labeled_features, num_rooms, num_corridors = label_dungeon_features(glyphs, level)
-    labeled_features[labeled_features <= num_rooms] = 0
-    labeled_features -= num_rooms
-    labeled_features[labeled_features < 0] = 0
+def room_detection(glyphs, level, labeled: Optional[LabeledFeatures] = None) -> Tuple[np.ndarray, int]:
+    if labeled is None:
+        labeled = LabeledFeatures.compute(glyphs, level)
+    return labeled.rooms, labeled.num_rooms
 
-    return labeled_features, num_corridors
 
+def corridor_detection(glyphs, level, labeled: Optional[LabeledFeatures] = None) -> Tuple[np.ndarray, int]:
+    if labeled is None:
+        labeled = LabeledFeatures.compute(glyphs, level)
+    return labeled.corridors, labeled.num_corridors
 
-def features_detection(glyphs, level) -> Tuple[np.ndarray, int, int]:
-    labeled_features, num_rooms, num_corridors = label_dungeon_features(glyphs, level)
 
-    return labeled_features, num_rooms + num_corridors
+def features_detection(glyphs, level, labeled: Optional[LabeledFeatures] = None) -> Tuple[np.ndarray, int]:
+    if labeled is None:
+        labeled = LabeledFeatures.compute(glyphs, level)
+    return labeled.labeled_features, labeled.num_rooms + labeled.num_corridors
@@ -1,13 +1,17 @@
-from collections import defaultdict
-from typing import Any, List, Tuple, Union
+import io
+import os
+from collections import OrderedDict, defaultdict
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
 
+import numba as nb
 import numpy as np
 from nle import nethack
 from numpy import int64, ndarray
 
 from nle_interface_wrapper.wrappers.properties import utils
 from nle_interface_wrapper.wrappers.properties.blstats import BLStats
-from nle_interface_wrapper.wrappers.properties.glyph import SS, C, G
+from nle_interface_wrapper.wrappers.properties.category import GC, GLYPH_CATEGORIES, classify
+from nle_interface_wrapper.wrappers.properties.glyph import C
 
 
 class SafeAccess:
@@ -21,6 +25,127 @@ class SafeAccess:
             return False
 
 
+# categories driving _update_kernel, in the order the kernel expects them
+_MASKS = np.array(
+    [
+        GC.FLOOR | GC.STAIR_UP | GC.STAIR_DOWN | GC.DOOR_OPENED | GC.TRAPS | GC.ALTAR | GC.FOUNTAIN | GC.SINK,
+        GC.MONS | GC.PETS | GC.BODIES | GC.OBJECTS | GC.STATUES,
+        GC.WALL | GC.DOOR_CLOSED | GC.BARS | GC.BOULDER | GC.LIQUID,
+        GC.DOORS,
+        GC.TRAPS,
+        GC.STAIR_DOWN | GC.STAIR_UP | GC.ALTAR | GC.FOUNTAIN | GC.THRONE | GC.SINK | GC.GRAVE | GC.TRAPS,
+        GC.SWALLOW,
+        GC.DOOR_CLOSED,
+    ],
+    np.uint64,
+)
+
+
+@nb.njit(
+    "Tuple((i8[:,:], b1))(i2[:,:], u8[:,:], u8[:], i2[:,:], u8[:,:], b1[:,:], b1[:,:], b1[:,:], i2[:,:], i2[:,:], "
+    "b1[:,:], b1[:,:], i8, i8, u8[:])",
+    cache=True,
+)
+def _update_kernel(
+    glyphs,
+    categories,
+    lut,
+    objects,
+    object_categories,
+    walkable,
+    seen,
+    doors,
+    known_traps,
+    features,
+    was_on,
+    dirty,
+    py,
+    px,
+    masks,
+):
+    """
+    Level.update in one traversal of glyphs, returns the changed cells and whether dungeon features changed.
+    """
+    terrain, covering, blocking, door, trap, feature, swallow, door_closed = masks
+    height, width = glyphs.shape
+    changed = np.empty((glyphs.size, 2), dtype=nb.i8)
+    num_changed = 0
+    features_changed = False
+
+    # while swallowed the map isn't visible
+    for y in range(height):
+        for x in range(width):
+            if categories[y, x] & swallow:
+                return changed[:0], False
+
+    for y in range(height):
+        for x in range(width):
+            glyph = glyphs[y, x]
+            category = categories[y, x]
+            obj = objects[y, x]
+            is_walkable = walkable[y, x]
+            is_seen = seen[y, x]
+            is_door = doors[y, x]
+            known_trap = known_traps[y, x]
+            feat = features[y, x]
+
+            if category & terrain:
+                is_walkable = True
+                is_seen = True
+                obj = glyph
+            if category & covering:
+                is_seen = True
+                is_walkable = True
+                # categories of the last update, the object isn't touched above
+                if object_categories[y, x] & door_closed:
+                    obj = glyph + 2  # from closed to opened doors
+            if category & blocking:
+                is_seen = True
+                obj = glyph
+                is_walkable = False
+            if category & door:
+                is_door = True
+            if category & trap:
+                known_trap = glyph
+            if category & feature and feat != glyph:
+                feat = glyph
+                features_changed = True
+            on = was_on[y, x] or (y == py and x == px)
+
+            if obj != objects[y, x] or is_walkable != walkable[y, x]:
+                dirty[y, x] = True
+            if (
+                obj != objects[y, x]
+                or is_walkable != walkable[y, x]
+                or is_seen != seen[y, x]
+                or is_door != doors[y, x]
+                or known_trap != known_traps[y, x]
+                or feat != features[y, x]
+                or on != was_on[y, x]
+            ):
+                changed[num_changed, 0] = y
+                changed[num_changed, 1] = x
+                num_changed += 1
+
+            if obj != objects[y, x]:
+                objects[y, x] = obj
+                object_categories[y, x] = lut[obj] if 0 <= obj < lut.shape[0] else 0
+            walkable[y, x] = is_walkable
+            seen[y, x] = is_seen
+            doors[y, x] = is_door
+            known_traps[y, x] = known_trap
+            features[y, x] = feat
+            was_on[y, x] = on
+
+    return changed[:num_changed].copy(), features_changed
+
+
+# arrays which make up the state of a Level, object_categories and changed_cells are derived from them
+BOOL_PLANES = ("walkable", "seen", "doors", "was_on", "dirty")
+GLYPH_PLANES = ("objects", "known_traps", "features")
+COUNT_PLANES = ("search_count", "door_open_count")
+
+
 class Level:
     """
     Level class to store information about the current level.
@@ -42,6 +167,12 @@ class Level:
         self.known_traps[:] = -1
         self.features = np.zeros((C.SIZE_Y, C.SIZE_X), np.int16)
         self.features[:] = -1
+        self.object_categories = np.zeros((C.SIZE_Y, C.SIZE_X), np.uint64)
+        # cells whose objects or walkability changed since the last pop_dirty
+        self.dirty = np.zeros((C.SIZE_Y, C.SIZE_X), bool)
+        # (N, 2) cells changed by the last update, the version counts the updates which changed any cell
+        self.changed_cells = np.zeros((0, 2), np.int64)
+        self.version = 0
 
         self.search_count = np.zeros((C.SIZE_Y, C.SIZE_X), np.int32)
         self.door_open_count = np.zeros((C.SIZE_Y, C.SIZE_X), np.int32)
@@ -49,47 +180,188 @@ class Level:
     def key(self):
         return (self.dungeon_number, self.level_number)
 
-    def update(self, glyphs: ndarray, blstats: BLStats) -> None:
+    def update(self, glyphs: ndarray, blstats: BLStats, categories: Optional[ndarray] = None) -> bool:
         """
-        Update the level with the new glyphs and blstats.
+        Update the level with the new glyphs and blstats, `categories` are the glyph categories of glyphs.
+        All arrays are updated in a single pass, the cells which changed are kept in `changed_cells` and marked dirty.
+
+        :return: whether dungeon features changed, i.e. the terrain features need an update
         """
-        if utils.isin(glyphs, G.SWALLOW).any():
-            return
+        if categories is None:
+            categories = classify(glyphs)
 
-        mask = utils.isin(
-            glyphs, G.FLOOR, G.STAIR_UP, G.STAIR_DOWN, G.DOOR_OPENED, G.TRAPS, G.ALTAR, G.FOUNTAIN, G.SINK
+        self.changed_cells, features_changed = _update_kernel(
+            glyphs,
+            categories,
+            GLYPH_CATEGORIES,
+            self.objects,
+            self.object_categories,
+            self.walkable,
+            self.seen,
+            self.doors,
+            self.known_traps,
+            self.features,
+            self.was_on,
+            self.dirty,
+            int(blstats.y),
+            int(blstats.x),
+            _MASKS,
         )
-        self.walkable[mask] = True
-        self.seen[mask] = True
-        self.objects[mask] = glyphs[mask]
-
-        mask = utils.isin(glyphs, G.MONS, G.PETS, G.BODIES, G.OBJECTS, G.STATUES)
-        self.seen[mask] = True
-        self.walkable[mask] = True
-        doors_closed_mask = utils.isin(self.objects, G.DOOR_CLOSED)
-        self.objects[doors_closed_mask & mask] = glyphs[doors_closed_mask & mask] + 2  # from closed to opened doors
-
-        mask = utils.isin(glyphs, G.WALL, G.DOOR_CLOSED, G.BARS, G.BOULDER, frozenset({SS.S_lava, SS.S_water}))
-        self.seen[mask] = True
-        self.objects[mask] = glyphs[mask]
-        self.walkable[mask] = False
-
-        # TODO: it would be nice if we would change this to False when doors are destroyed
-        # how to detect that doors were destroyed
-        mask = utils.isin(glyphs, G.DOORS)
-        self.doors[mask] = True
-
-        mask = utils.isin(glyphs, G.TRAPS)
-        self.known_traps[mask] = glyphs[mask]
-        self.was_on[blstats.y, blstats.x] = True
-
-        mask = utils.isin(glyphs, G.STAIR_DOWN, G.STAIR_UP, G.ALTAR, G.FOUNTAIN, G.THRONE, G.SINK, G.GRAVE, G.TRAPS)
-        if not np.all(self.features[mask] == glyphs[mask]):
-            self.features[mask] = glyphs[mask]
-            # means that we need to update terrain features
-            return True
-        else:
-            return False
+        if len(self.changed_cells):
+            self.version += 1
+        return features_changed
 
-    def object_coords(self, obj: frozenset) -> List[Union[Any, Tuple[int64, int64]]]:
+    def pop_dirty(self) -> ndarray:
+        dirty = self.dirty
+        self.dirty = np.zeros_like(dirty)
+        return dirty
+
+    def object_coords(self, obj: Union[frozenset, utils.IsinMask]) -> List[Union[Any, Tuple[int64, int64]]]:
+        """
+        Cells of the objects in obj, a glyph set of G or a handle such as G.MASKS["DOORS"].
+        """
         return utils.coords(self.objects, obj)
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Memory used by the arrays of the level.
+        """
+        planes = (*BOOL_PLANES, *GLYPH_PLANES, *COUNT_PLANES, "object_categories", "changed_cells")
+        return sum(getattr(self, name).nbytes for name in planes)
+
+    def pack(self) -> bytes:
+        """
+        Compact representation of the level: bit-packed boolean planes, counters in the smallest dtype
+        which holds them, everything in a compressed npz archive.
+        """
+        arrays = {
+            "key": np.array([self.dungeon_number, self.level_number], dtype=np.int64),
+            "version": np.array(self.version, dtype=np.int64),
+        }
+        arrays.update({f"bool_{name}": np.packbits(getattr(self, name)) for name in BOOL_PLANES})
+        arrays.update({f"glyph_{name}": getattr(self, name) for name in GLYPH_PLANES})
+        arrays.update({f"count_{name}": _shrink(getattr(self, name)) for name in COUNT_PLANES})
+        buffer = io.BytesIO()
+        np.savez_compressed(buffer, **arrays)
+        return buffer.getvalue()
+
+    @classmethod
+    def unpack(cls, blob: bytes) -> "Level":
+        with np.load(io.BytesIO(blob)) as arrays:
+            level = cls(*(int(value) for value in arrays["key"]))
+            shape = level.walkable.shape
+            for name in BOOL_PLANES:
+                packed = arrays[f"bool_{name}"]
+                getattr(level, name)[:] = np.unpackbits(packed, count=level.walkable.size).reshape(shape).astype(bool)
+            for name in GLYPH_PLANES:
+                getattr(level, name)[:] = arrays[f"glyph_{name}"]
+            for name in COUNT_PLANES:
+                getattr(level, name)[:] = arrays[f"count_{name}"]
+            level.version = int(arrays["version"])
+        level.object_categories = classify(level.objects)
+        return level
+
+
+def _shrink(array: ndarray) -> ndarray:
+    """
+    Casts a non-negative counter array to the smallest unsigned dtype which holds its values.
+    """
+    return array.astype(np.min_scalar_type(max(int(array.max()), 0)))
+
+
+class LevelStore:
+    """
+    Levels by (dungeon_number, level_number), kept as arrays for the `max_active` most recently used levels.
+
+    Older levels are packed (Level.pack) into an in-memory blob, with `spill_dir` into a file in that directory,
+    and unpacked again when they are visited. clear() removes the spilled files. `on_evict(key)` is called when a level is
+    packed, e.g. to drop state derived from it.
+    """
+
+    def __init__(
+        self,
+        max_active: int = 4,
+        spill_dir: Optional[str] = None,
+        on_evict: Optional[Callable[[Tuple[int, int]], None]] = None,
+    ):
+        assert max_active >= 1
+        self.max_active = max_active
+        self.spill_dir = spill_dir
+        self.on_evict = on_evict
+        self.active: "OrderedDict[Tuple[int, int], Level]" = OrderedDict()
+        self.packed: Dict[Tuple[int, int], bytes] = {}
+        self.spilled: Dict[Tuple[int, int], str] = {}
+        self.packs = 0
+        self.unpacks = 0
+
+    def __contains__(self, key) -> bool:
+        return key in self.active or key in self.packed or key in self.spilled
+
+    def __len__(self) -> int:
+        return len(self.active) + len(self.packed) + len(self.spilled)
+
+    def keys(self) -> List[Tuple[int, int]]:
+        return [*self.active, *self.packed, *self.spilled]
+
+    def __getitem__(self, key) -> Level:
+        if key in self.active:
+            self.active.move_to_end(key)
+            return self.active[key]
+
+        if key in self.packed:
+            blob = self.packed.pop(key)
+        elif key in self.spilled:
+            path = self.spilled.pop(key)
+            with open(path, "rb") as f:
+                blob = f.read()
+            os.remove(path)
+        else:
+            raise KeyError(key)
+
+        self.unpacks += 1
+        level = Level.unpack(blob)
+        self[key] = level
+        return level
+
+    def __setitem__(self, key, level: Level):
+        self.packed.pop(key, None)
+        self.spilled.pop(key, None)
+        self.active[key] = level
+        self.active.move_to_end(key)
+        while len(self.active) > self.max_active:
+            self.evict(next(iter(self.active)))
+
+    def evict(self, key):
+        blob = self.active.pop(key).pack()
+        self.packs += 1
+        if self.spill_dir is not None:
+            path = os.path.join(self.spill_dir, f"level_{key[0]}_{key[1]}.bin")
+            with open(path, "wb") as f:
+                f.write(blob)
+            self.spilled[key] = path
+        else:
+            self.packed[key] = blob
+        if self.on_evict is not None:
+            self.on_evict(key)
+
+    def clear(self):
+        for path in self.spilled.values():
+            if os.path.exists(path):
+                os.remove(path)
+        self.active.clear()
+        self.packed.clear()
+        self.spilled.clear()
+
+    def memory_report(self) -> Dict[Tuple[int, int], Dict[str, Any]]:
+        """
+        Per level state ("active", "packed" or "spilled") and the bytes it takes, in memory or on disk.
+        """
+        report = {}
+        for key, level in self.active.items():
+            report[key] = {"state": "active", "bytes": level.nbytes}
+        for key, blob in self.packed.items():
+            report[key] = {"state": "packed", "bytes": len(blob)}
+        for key, path in self.spilled.items():
+            report[key] = {"state": "spilled", "bytes": os.path.getsize(path)}
+        return report
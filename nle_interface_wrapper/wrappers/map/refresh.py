@@ -0,0 +1,113 @@
+from collections import defaultdict
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+from nle_interface_wrapper.wrappers.map.level import Level
+from nle_interface_wrapper.wrappers.properties.message_events import MESSAGE_EVENTS, MessageEvent
+
+MESSAGE_EVENTS.register(
+    "fell_through",
+    r"A trap door opens up under you!|There's a gaping hole under you!|You fall through (?:a trap door|a hole)",
+)
+MESSAGE_EVENTS.register("teleported", r"You (?:suddenly )?materialize|You feel a wrenching sensation\.")
+
+# env steps spent by AddTextMap.cache_terrain: #, t, e, MORE, b, ESC
+HIDDEN_STEPS = 6
+
+
+class TerrainRefreshPolicy:
+    """
+    Decides when AddTextMap re-reads the terrain (#terrain) of the current level.
+
+    The terrain is refreshed when the level wasn't read yet, after a teleport or a fall through a trap door,
+    and when the map shows something the last read couldn't: cells first seen under monsters or objects
+    (their terrain is unknown) or changed dungeon features, at most once per `min_interval` turns.
+    Otherwise the terrain is only re-read every `fallback_interval` turns.
+
+    To report the savings, the fixed `legacy_interval` polling which the policy replaces is replayed
+    alongside, hidden_steps_saved is the difference of the hidden steps spent by both.
+    """
+
+    def __init__(self, min_interval: int = 10, fallback_interval: int = 200, legacy_interval: int = 50):
+        self.min_interval = min_interval
+        self.fallback_interval = fallback_interval
+        self.legacy_interval = legacy_interval
+
+        # level key -> cells whose terrain was unknown at the last refresh
+        self.covered: Dict[Tuple[int, int], np.ndarray] = {}
+        # levels whose dungeon features changed since their last refresh
+        self.features_pending: Set[Tuple[int, int]] = set()
+
+        self.refreshes: Dict[str, int] = defaultdict(int)
+        self.hidden_steps = 0
+        self.legacy_times: Dict[Tuple[int, int], int] = {}
+        self.legacy_hidden_steps = 0
+
+    @property
+    def hidden_steps_saved(self) -> int:
+        return self.legacy_hidden_steps - self.hidden_steps
+
+    @staticmethod
+    def covered_cells(level: Level) -> np.ndarray:
+        return level.seen & (level.objects == -1)
+
+    def check(
+        self,
+        level: Level,
+        time: int,
+        last_time: Optional[int],
+        features_changed: bool,
+        message_events: Dict[str, List[MessageEvent]],
+    ) -> Optional[str]:
+        """
+        Returns the reason to refresh the terrain now, None if it's still up to date.
+        `last_time` is the turn of the last refresh of the level, None if it was never read.
+        """
+        key = level.key()
+        self.replay_legacy(key, time)
+        # kept until the refresh runs, changes within min_interval aren't lost
+        if features_changed:
+            self.features_pending.add(key)
+
+        if last_time is None:
+            return "level_change"
+        if "fell_through" in message_events or "teleported" in message_events:
+            return "teleport"
+
+        if time - last_time >= self.min_interval:
+            if key in self.features_pending:
+                return "features"
+            covered = self.covered.get(key)
+            if covered is None or (self.covered_cells(level) & ~covered).any():
+                return "covered"
+
+        if time - last_time > self.fallback_interval:
+            return "timer"
+        return None
+
+    def mark(self, level: Level, time: int):
+        """
+        Records a read of the terrain which doesn't count as a refresh, e.g. the one on reset.
+        """
+        self.covered[level.key()] = self.covered_cells(level)
+        self.features_pending.discard(level.key())
+        self.legacy_times[level.key()] = time
+
+    def refreshed(self, level: Level, reason: str):
+        self.covered[level.key()] = self.covered_cells(level)
+        self.features_pending.discard(level.key())
+        self.refreshes[reason] += 1
+        self.hidden_steps += HIDDEN_STEPS
+
+    def replay_legacy(self, key: Tuple[int, int], time: int):
+        if time - self.legacy_times.get(key, 0) > self.legacy_interval:
+            self.legacy_times[key] = time
+            self.legacy_hidden_steps += HIDDEN_STEPS
+
+    def __str__(self):
+        reasons = ", ".join(f"{reason}: {count}" for reason, count in self.refreshes.items())
+        return (
+            f"terrain refreshes ({reasons}), hidden steps {self.hidden_steps}, "
+            f"saved {self.hidden_steps_saved} of {self.legacy_hidden_steps}"
+        )
@@ -2,16 +2,80 @@ import numpy as np
 from scipy import ndimage
 
 
-def get_revelable_positions(level, labeled_features):
+def get_revelable_grid(level, labeled_features):
     """
-    Finds walkable tiles that unvail new areas, based on the edges
+    Boolean grid of the walkable tiles that unvail new areas, based on the edges
     """
     # get unexplored positions of the room
     structure = ndimage.generate_binary_structure(2, 2)
     unexplored_edges = np.logical_and(ndimage.binary_dilation(~level.seen, structure), level.seen)
     walkable_edges = np.logical_and(unexplored_edges, level.walkable)  # we use level.walkable to exclude walls etc.
     discovery_potential = np.logical_and(walkable_edges, ~level.was_on)
-    feature_unexplored = np.logical_and(labeled_features, discovery_potential)
-    unexplored_positions = np.argwhere(feature_unexplored)
+    return np.logical_and(labeled_features, discovery_potential)
+
+
+def get_revelable_positions(level, labeled_features):
+    """
+    Finds walkable tiles that unvail new areas, based on the edges
+    """
+    return np.argwhere(get_revelable_grid(level, labeled_features))
+
+
+def has_frontier(labels, num_labels, revelable):
+    """
+    Whether every label (index 0 is the background) contains a revelable tile.
+    """
+    return count_per_label(labels, num_labels, mask=revelable) > 0
+
 
-    return unexplored_positions
+def count_per_label(labels, num_labels, mask=None, positions=None):
+    """
+    Number of cells of every label (index 0 is the background) within mask or at the (N, 2) positions.
+    """
+    if positions is not None:
+        values = labels[positions[:, 0], positions[:, 1]] if len(positions) else labels[:0, 0]
+    else:
+        values = labels[mask]
+    return np.bincount(values, minlength=num_labels + 1)
+
+
+def nearest_per_label(labels, num_labels, position, distance_field=None):
+    """
+    Distance from position to the closest cell of every label and that cell.
+    With a distance_field (walking distances, -1 where unreachable) reachable cells are preferred and
+    measured by it, other cells by the Manhattan distance. Ties are broken by the Manhattan distance,
+    then in row-major order.
+
+    Returns:
+        (num_labels + 1,) distances and (num_labels + 1, 2) cells, -1 for labels without cells
+    """
+    cells = np.argwhere(labels > 0)
+    cell_labels = labels[cells[:, 0], cells[:, 1]]
+    manhattan = np.abs(cells - np.asarray(position)).sum(axis=1)
+    distances = manhattan
+    unreachable = np.zeros(len(cells), bool)
+    if distance_field is not None:
+        walking = distance_field[cells[:, 0], cells[:, 1]]
+        unreachable = walking < 0
+        distances = np.where(unreachable, distances, walking)
+
+    # sorted by label, then reachability, distance and Manhattan distance, stable in row-major order
+    order = np.lexsort((manhattan, distances, unreachable, cell_labels))
+    first = order[np.unique(cell_labels[order], return_index=True)[1]]
+
+    nearest_distances = np.full(num_labels + 1, -1, np.int64)
+    nearest_cells = np.full((num_labels + 1, 2), -1, np.int64)
+    nearest_distances[cell_labels[first]] = distances[first]
+    nearest_cells[cell_labels[first]] = cells[first]
+    return nearest_distances, nearest_cells
+
+
+def nearest_cell(mask, distance_field):
+    """
+    The reachable cell of mask with the smallest walking distance and the distance, (None, -1) if there is none.
+    """
+    distances = np.where(mask & (distance_field >= 0), distance_field, np.iinfo(distance_field.dtype).max)
+    index = np.argmin(distances)
+    if distances.flat[index] == np.iinfo(distance_field.dtype).max:
+        return None, -1
+    return np.unravel_index(index, mask.shape), int(distances.flat[index])
@@ -1,24 +1,57 @@
-import re
+import shutil
+import tempfile
 from collections import defaultdict
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional, Tuple
 
 import gymnasium as gym
 import numpy as np
 from nle.nethack import actions as A
 from scipy import ndimage
 
-from nle_interface_wrapper.wrappers.map.label import corridor_detection, room_detection
-from nle_interface_wrapper.wrappers.map.level import Level
-from nle_interface_wrapper.wrappers.map.utils import get_revelable_positions
+from nle_interface_wrapper.wrappers.map.distance import LevelDistances
+from nle_interface_wrapper.wrappers.map.label import IncrementalLabeler, corridor_detection, room_detection
+from nle_interface_wrapper.wrappers.map.level import Level, LevelStore
+from nle_interface_wrapper.wrappers.map.refresh import TerrainRefreshPolicy
+from nle_interface_wrapper.wrappers.map.utils import (
+    count_per_label,
+    get_revelable_grid,
+    has_frontier,
+    nearest_cell,
+    nearest_per_label,
+)
 from nle_interface_wrapper.wrappers.properties.blstats import BLStats
+from nle_interface_wrapper.wrappers.properties.category import GC, has
 from nle_interface_wrapper.wrappers.properties.entity import Entity
-from nle_interface_wrapper.wrappers.properties.glyph import SHOP, G
-from nle_interface_wrapper.wrappers.properties.utils import isin
+from nle_interface_wrapper.wrappers.properties.glyph import MON, SHOP
+from nle_interface_wrapper.wrappers.properties.message_events import MESSAGE_EVENTS, MessageEvent
+from nle_interface_wrapper.wrappers.properties.spatial import SpatialIndex
+from nle_interface_wrapper.wrappers.reset_cache import ResetCache, states_equal
+
+MESSAGE_EVENTS.register("shop_entered", f"Welcome( again)? to [a-zA-Z' ]*({'|'.join(SHOP.name2id.keys())})!")
 
 
 class AddTextMap(gym.Wrapper):
-    def __init__(self, env):
+    """
+    Adds a text description of the rooms of the current level as "text_map".
+
+    Levels which weren't visited recently are kept packed, see LevelStore. `max_active_levels` is the number
+    of levels kept unpacked, with `spill_dir` packed levels are written to disk, into a temporary directory
+    below it which is emptied on reset and removed on close.
+    """
+
+    def __init__(
+        self,
+        env,
+        reset_cache: Optional[ResetCache] = None,
+        max_active_levels: int = 4,
+        spill_dir: Optional[str] = None,
+    ):
         super().__init__(env)
+        self.reset_cache = reset_cache
+        self.max_active_levels = max_active_levels
+        self.spill_dir = spill_dir
+        self.spill_path: Optional[str] = None
+        self.levels: Optional[LevelStore] = None
 
     def cache_terrain(self):
         self.env.step(self.env.actions.index(ord("#")))
@@ -28,9 +61,9 @@ class AddTextMap(gym.Wrapper):
 
         obs, *_ = self.env.step(self.env.actions.index(ord("b")))
         blstats: BLStats = self.get_blstats(obs)
-        glyphs: np.ndarray = self.get_glyphs(obs)
+        glyph_categories: np.ndarray = self.env.get_wrapper_attr("glyph_categories")
 
-        self.update_terrain_features(glyphs, blstats, force=True)
+        self.update_terrain_features(glyph_categories, blstats, force=True)
 
         self.env.step(self.env.actions.index(A.Command.ESC))
 
@@ -39,25 +72,64 @@ class AddTextMap(gym.Wrapper):
 
         self.terrain_features = defaultdict(dict)
         self.shops = defaultdict(list)
-        self.levels = {}
+        self.labelers = {}
+        self.distances = {}
+        if self.levels is not None:
+            self.levels.clear()
+        if self.spill_dir is not None and self.spill_path is None:
+            self.spill_path = tempfile.mkdtemp(prefix="levels_", dir=self.spill_dir)
+        self.levels = LevelStore(self.max_active_levels, self.spill_path, on_evict=self.on_level_evicted)
         self.map_description = ""
+        self.terrain_version = 0
+        self.map_state_key = None
+        self.map_text_key = None
+        self.map_cache_hits = 0
+        self.map_cache_misses = 0
+        self.terrain_refresh = TerrainRefreshPolicy()
+        self.features_changed = False
 
         self.update()
 
-        self.cache_terrain()
+        if self.reset_cache is not None:
+            terrain_features = self.reset_cache.load(self, "terrain", kwargs.get("seed"), self.parse_initial_terrain)
+            self.terrain_features = defaultdict(dict, terrain_features)
+            self.terrain_version += 1
+        else:
+            self.cache_terrain()
+        self.terrain_refresh.mark(self.current_level, self.env.get_wrapper_attr("blstats").time)
 
         return self.populate_obs(obs), info
 
+    def close(self):
+        if self.spill_path is not None:
+            shutil.rmtree(self.spill_path, ignore_errors=True)
+            self.spill_path = None
+        super().close()
+
+    def parse_initial_terrain(self):
+        self.cache_terrain()
+        return dict(self.terrain_features)
+
     def step(self, action):
         obs, reward, terminated, truncated, info = self.env.step(action)
 
         self.update()
 
         blstats: BLStats = self.env.get_wrapper_attr("blstats")
-        # update terrain features every 50 turns
-        last_time = self.terrain_features[(blstats.dungeon_number, blstats.level_number)].get("time", 0)
-        if blstats.time - last_time > 50:
-            self.cache_terrain()
+        message_events: Dict[str, List[MessageEvent]] = self.env.get_wrapper_attr("message_events")
+        # update terrain features when the level changed in a way the glyphs can't tell, see TerrainRefreshPolicy
+        last_time = self.terrain_features[(blstats.dungeon_number, blstats.level_number)].get("time")
+        if not (terminated or truncated):
+            reason = self.terrain_refresh.check(
+                self.current_level,
+                blstats.time,
+                last_time,
+                self.features_changed,
+                message_events,
+            )
+            if reason is not None:
+                self.cache_terrain()
+                self.terrain_refresh.refreshed(self.current_level, reason)
 
         return self.populate_obs(obs), reward, terminated, truncated, info
 
@@ -66,21 +138,24 @@ class AddTextMap(gym.Wrapper):
 
     def update(self):
         blstats: BLStats = self.env.get_wrapper_attr("blstats")
-        message: str = self.env.get_wrapper_attr("message")
+        message_events: Dict[str, List[MessageEvent]] = self.env.get_wrapper_attr("message_events")
         glyphs: np.ndarray = self.env.get_wrapper_attr("glyphs")
+        glyph_categories: np.ndarray = self.env.get_wrapper_attr("glyph_categories")
         entity: Entity = self.env.get_wrapper_attr("entity")
-        entities: List[Entity] = self.env.get_wrapper_attr("entities")
+        entity_table: np.ndarray = self.env.get_wrapper_attr("entity_table")
+        spatial_index: SpatialIndex = self.env.get_wrapper_attr("spatial_index")
 
         self.current_level = self.get_current_level(blstats)
 
-        self.current_level.update(glyphs, blstats)
-        self.update_terrain_features(glyphs, blstats)
-        self.update_shops(blstats, message, entity, entities)
+        # Level.update returns True when dungeon features changed
+        self.features_changed = bool(self.current_level.update(glyphs, blstats, glyph_categories))
+        self.update_terrain_features(glyph_categories, blstats)
+        self.update_shops(blstats, message_events, entity, entity_table, spatial_index)
 
-        self.map_description = self.describe_map(glyphs, blstats, entity)
+        self.map_description = self.describe_map(glyphs, glyph_categories, blstats, entity)
 
-    def update_terrain_features(self, glyphs, blstats: BLStats, force: bool = False):
-        current_features = self.get_terrain_features(glyphs)
+    def update_terrain_features(self, glyph_categories, blstats: BLStats, force: bool = False):
+        current_features = self.get_terrain_features(glyph_categories)
 
         if not force:
             past_features = self.terrain_features[(blstats.dungeon_number, blstats.level_number)].get("features", {})
@@ -103,49 +178,61 @@ class AddTextMap(gym.Wrapper):
             # update time only when force
             self.terrain_features[(blstats.dungeon_number, blstats.level_number)]["time"] = blstats.time
 
+        previous_features = self.terrain_features[(blstats.dungeon_number, blstats.level_number)].get("features")
+        # the order of the features is the order in the text
+        if (
+            previous_features is None
+            or list(previous_features) != list(current_features)
+            or not states_equal(previous_features, current_features)
+        ):
+            self.terrain_version += 1
         self.terrain_features[(blstats.dungeon_number, blstats.level_number)]["features"] = current_features
 
-    def get_terrain_features(self, glyphs) -> Dict[str, Any]:
+    def get_terrain_features(self, glyph_categories) -> Dict[str, Any]:
         """
         Returns the terrain features of the current level.
         """
         name_glyph = {
-            "stairs down": G.STAIR_DOWN,
-            "stairs up": G.STAIR_UP,
-            "altar": G.ALTAR,
-            "fountain": G.FOUNTAIN,
-            "throne": G.THRONE,
-            "sink": G.SINK,
-            "trap": G.TRAPS,
-            "grave": G.GRAVE,
+            "stairs down": GC.STAIR_DOWN,
+            "stairs up": GC.STAIR_UP,
+            "altar": GC.ALTAR,
+            "fountain": GC.FOUNTAIN,
+            "throne": GC.THRONE,
+            "sink": GC.SINK,
+            "trap": GC.TRAPS,
+            "grave": GC.GRAVE,
         }
 
         terrain_features = {}
-        for name, glyph in name_glyph.items():
-            mask = isin(glyphs, glyph)
+        for name, category in name_glyph.items():
+            mask = has(glyph_categories, category)
             positions = np.argwhere(mask)
             if len(positions) > 0:
                 terrain_features[name] = positions
 
         return terrain_features
 
-    def update_shops(self, blstats: BLStats, message: str, entity: Entity, entities: List[Entity]):
+    def update_shops(
+        self,
+        blstats: BLStats,
+        message_events: Dict[str, List[MessageEvent]],
+        entity: Entity,
+        entity_table: np.ndarray,
+        spatial_index: SpatialIndex,
+    ):
         shop_type = None
-        matches = re.search(f"Welcome( again)? to [a-zA-Z' ]*({'|'.join(SHOP.name2id.keys())})!", message)
-
-        if matches is None:
+        if "shop_entered" not in message_events:
             return
 
-        shop_name = matches.groups()[1]
+        shop_name = message_events["shop_entered"][0].groups[1]
         assert shop_name in SHOP.name2id, shop_name
         shop_type = SHOP.name2id[shop_name]
         shop_string = SHOP.id2string[shop_type]
 
-        shop_keepers = [ent.position for ent in entities if ent.name == "shopkeeper"]
-        assert len(shop_keepers) > 0, "No shopkeepers found"
-
-        # TODO: chebyshev distance
-        closest_shop_keeper = min(shop_keepers, key=lambda sk: np.linalg.norm(np.array(sk) - np.array(entity.position)))
+        shop_keepers = entity_table["mon_id"] == MON.id_from_name("shopkeeper")
+        closest, _ = spatial_index.nearest(entity.position, where=shop_keepers)
+        assert len(closest) > 0, "No shopkeepers found"
+        closest_shop_keeper = tuple(spatial_index.positions()[closest[0]])
 
         self.shops[(blstats.dungeon_number, blstats.level_number)].append(
             {
@@ -155,16 +242,91 @@ class AddTextMap(gym.Wrapper):
             }
         )
 
-    def describe_room(
+    def describe_rooms(
         self,
         blstats: BLStats,
-        entity: Entity,
-        room_mask: np.ndarray,
+        labeled_rooms: np.ndarray,
+        num_rooms: int,
         dilated_corridors: np.ndarray,
         dilated_doors: np.ndarray,
         dilated_bars: np.ndarray,
-        revelable_positions: np.ndarray,
-    ):
+        room_frontiers: np.ndarray,
+    ) -> List[Dict[str, Any]]:
+        """
+        Describes all rooms at once, the statistics of every room are aggregated over the labels in a single pass
+        and indexed by room id. Only depends on the state of the level, distances and directions to the rooms
+        are added by describe_directions.
+        """
+        # Exploration status, rooms with revelable positions are explored only partially
+        visited = count_per_label(labeled_rooms, num_rooms, mask=self.current_level.was_on) > 0
+
+        # Exits, closed doors and bars next to the rooms
+        num_corridor_exits = count_per_label(labeled_rooms, num_rooms, mask=dilated_corridors)
+        num_door_exits = count_per_label(labeled_rooms, num_rooms, mask=dilated_doors)
+        num_bar_exits = count_per_label(labeled_rooms, num_rooms, mask=dilated_bars)
+
+        # Info about features: stairs, fountains, sinks, altars, etc.
+        # TODO: add shops
+        map_features = self.terrain_features[(blstats.dungeon_number, blstats.level_number)].get("features", {})
+        feature_counts = {
+            feature_name: count_per_label(labeled_rooms, num_rooms, positions=positions)
+            for feature_name, positions in map_features.items()
+        }
+
+        name_plural = {
+            "stairs down": ("stairs down", "stairs down"),
+            "stairs up": ("stairs up", "stairs up"),
+            "altar": ("an altar", "altars"),
+            "fountain": ("a fountain", "fountains"),
+            "throne": ("a throne", "thrones"),
+            "sink": ("a sink", "sinks"),
+            "trap": ("a trap", "traps"),
+            "grave": ("a grave", "graves"),
+        }
+
+        # the first shop registered in a room names it
+        shop_names = [None] * (num_rooms + 1)
+        for shop_info in reversed(self.shops[blstats.dungeon_number, blstats.level_number]):
+            shop_names[labeled_rooms[shop_info["position"]]] = shop_info["name"]
+
+        rooms_info = []
+        for room_id in range(1, num_rooms + 1):
+            if room_frontiers[room_id]:
+                # Visited the room
+                explored = "Partially explored" if visited[room_id] else "Unexplored"
+            else:
+                explored = "Explored"
+
+            features = []
+            for feature, counts in feature_counts.items():
+                count = counts[room_id]
+                if count == 1:
+                    features.append(name_plural[feature][0])
+                elif count > 1:
+                    features.append(f"{count} {name_plural[feature][1]}")
+
+            num_exits = num_corridor_exits[room_id] + num_door_exits[room_id] + num_bar_exits[room_id]
+            rooms_info.append(
+                {
+                    "explored": explored,
+                    "num_exits": num_exits,
+                    "num_closed_doors": num_door_exits[room_id],
+                    "num_bars": num_bar_exits[room_id],
+                    "features": features,
+                    "shop_name": shop_names[room_id],
+                    "room_id": room_id,
+                }
+            )
+
+        return rooms_info
+
+    def describe_directions(
+        self, entity: Entity, labeled_rooms: np.ndarray, num_rooms: int, distance_field: np.ndarray
+    ) -> List[Tuple[str, str]]:
+        """
+        (distance, direction) of every room as seen from the player.
+        """
+
         def direction_to(from_xy, to_xy):
             """
             Returns a string describing the direction.
@@ -201,110 +363,82 @@ class AddTextMap(gym.Wrapper):
                     return name
             return "unknown"
 
-        room_coords = np.argwhere(room_mask)
         py, px = entity.position
 
-        # Describe the exploration status, first check for revelable positions
-        if len(revelable_positions) > 0 and np.any(
-            np.all(room_coords[:, None] == revelable_positions[None, :], axis=-1)
-        ):
-            # Visited the room
-            if np.any(np.logical_and(self.current_level.was_on, room_mask)):
-                explored = "Partially explored"
-            else:
-                explored = "Unexplored"
-        else:
-            explored = "Explored"
-
-        # Compute the number of exits
-        corridor_exits = np.argwhere(np.logical_and(dilated_corridors, room_mask))
-        door_exits = np.argwhere(np.logical_and(dilated_doors, room_mask))
-        bar_exits = np.argwhere(np.logical_and(dilated_bars, room_mask))
-        num_exits = len(corridor_exits) + len(door_exits) + len(bar_exits)
-        num_closed_doors = len(door_exits)
-        num_bars = len(bar_exits)
-
-        # Info about features: stairs, fountains, sinks, altars, etc.
-        # TODO: add shops
-        map_features = self.terrain_features[(blstats.dungeon_number, blstats.level_number)].get("features", {})
-        room_features = defaultdict(int)
-        for feature_name, positions in map_features.items():
-            for pos in positions:
-                if room_mask[tuple(pos)]:
-                    room_features[feature_name] += 1
-
-        name_plural = {
-            "stairs down": ("stairs down", "stairs down"),
-            "stairs up": ("stairs up", "stairs up"),
-            "altar": ("an altar", "altars"),
-            "fountain": ("a fountain", "fountains"),
-            "throne": ("a throne", "thrones"),
-            "sink": ("a sink", "sinks"),
-            "trap": ("a trap", "traps"),
-            "grave": ("a grave", "graves"),
-        }
+        # Walking distance from the player to the closest cell of every room
+        room_distances, room_cells = nearest_per_label(labeled_rooms, num_rooms, (py, px), distance_field)
 
-        features = []
-        for feature, count in room_features.items():
-            if count == 1:
-                features.append(name_plural[feature][0])
-            elif count > 1:
-                features.append(f"{count} {name_plural[feature][1]}")
-
-        shop_name = None
-        for shop_info in self.shops[blstats.dungeon_number, blstats.level_number]:
-            if room_mask[shop_info["position"]]:
-                shop_name = shop_info["name"]
-                break
-
-        # Compute distance from the player to the room
-        room_distances = np.sum(np.abs(np.array(entity.position) - room_coords), axis=1)
-        idx = np.argmin(room_distances)
-
-        # Describe the distance
-        distance = get_distance_name(room_distances[idx])
-
-        # Describe the direction
-        in_this_room = room_distances[idx] == 0
-        if in_this_room:
-            direction = "here"
-        else:
-            direction = direction_to((py, px), room_coords[idx])
-
-        return {
-            "explored": explored,
-            "distance": distance,
-            "direction": direction,
-            "num_exits": num_exits,
-            "num_closed_doors": num_closed_doors,
-            "num_bars": num_bars,
-            "features": features,
-            "shop_name": shop_name,
-        }
+        directions = []
+        for room_id in range(1, num_rooms + 1):
+            distance = get_distance_name(room_distances[room_id])
+            in_this_room = room_distances[room_id] == 0
+            if in_this_room:
+                direction = "here"
+            else:
+                direction = direction_to((py, px), room_cells[room_id])
+            directions.append((distance, direction))
+
+        return directions
+
+    def describe_map(self, glyphs, glyph_categories, blstats, entity):
+        key = self.current_level.key()
+        # everything but the distances and directions only depends on these, closed doors and bars are tracked
+        # in the level's objects, so they are covered by its version
+        state_key = (
+            key,
+            self.current_level.version,
+            self.terrain_version,
+            len(self.shops[key]),
+        )
+        if state_key != self.map_state_key:
+            if key not in self.labelers:
+                self.labelers[key] = IncrementalLabeler(glyphs.shape)
+            self.labeled_features = self.labelers[key].update(self.current_level)
+            labeled_rooms, num_rooms = room_detection(glyphs, self.current_level, self.labeled_features)
+            labeled_corridors, num_corridors = corridor_detection(glyphs, self.current_level, self.labeled_features)
+            self.revelable = get_revelable_grid(self.current_level, labeled_rooms)
+            room_frontiers = has_frontier(labeled_rooms, num_rooms, self.revelable)
+
+            dilated_corridors = ndimage.binary_dilation(labeled_corridors)
+            dilated_doors = ndimage.binary_dilation(has(glyph_categories, GC.DOOR_CLOSED))
+            dilated_bars = ndimage.binary_dilation(has(glyph_categories, GC.BARS))
+
+            self.rooms_info = self.describe_rooms(
+                blstats,
+                labeled_rooms,
+                num_rooms,
+                dilated_corridors,
+                dilated_doors,
+                dilated_bars,
+                room_frontiers,
+            )
+            self.map_state_key = state_key
 
-    def describe_map(self, glyphs, blstats, entity):
-        labeled_rooms, num_rooms = room_detection(glyphs, self.current_level)
-        labeled_corridors, num_corridors = corridor_detection(glyphs, self.current_level)
-        revelable_positions = get_revelable_positions(self.current_level, labeled_rooms)
+        labeled_rooms = self.labeled_features.rooms
+        num_rooms = self.labeled_features.num_rooms
 
-        dilated_corridors = ndimage.binary_dilation(labeled_corridors)
-        dilated_doors = ndimage.binary_dilation(isin(glyphs, G.DOOR_CLOSED))
-        dilated_bars = ndimage.binary_dilation(isin(glyphs, G.BARS))
+        if key not in self.distances:
+            self.distances[key] = LevelDistances()
+        self.distance_field = self.distances[key].get(self.current_level, entity.position)
+        self.nearest_frontier, self.nearest_frontier_distance = nearest_cell(self.revelable, self.distance_field)
 
-        rooms_info = []
-        for room_id in range(1, num_rooms + 1):
-            room = labeled_rooms == room_id
+        directions = self.describe_directions(entity, labeled_rooms, num_rooms, self.distance_field)
 
-            room_info = self.describe_room(
-                blstats, entity, room, dilated_corridors, dilated_doors, dilated_bars, revelable_positions
-            )
-            room_info["room_id"] = room_id
+        # the text only changes with the level state, the player's room and the distances and directions
+        text_key = (state_key, int(labeled_rooms[entity.position]), tuple(directions))
+        if text_key == self.map_text_key:
+            self.map_cache_hits += 1
+            return self.map_description
+        self.map_cache_misses += 1
+        self.map_text_key = text_key
 
-            rooms_info.append(room_info)
+        rooms_info = [
+            {**room_info, "distance": distance, "direction": direction}
+            for room_info, (distance, direction) in zip(self.rooms_info, directions)
+        ]
 
         desc = []
         for room_info in rooms_info:
-            room_id = room_info["room_id"]
             explored = room_info["explored"]
             distance = room_info["distance"]
             direction = room_info["direction"]
@@ -351,6 +485,22 @@ class AddTextMap(gym.Wrapper):
 
         return "\n".join(desc)
 
+    def on_level_evicted(self, key):
+        # the labeler relabels the level from scratch when it's visited again
+        self.labelers.pop(key, None)
+        self.distances.pop(key, None)
+
+    @property
+    def map_cache_hit_rate(self) -> float:
+        """
+        Share of the steps which reused the map description of the previous step.
+        """
+        total = self.map_cache_hits + self.map_cache_misses
+        return self.map_cache_hits / total if total else 0.0
+
+    def memory_report(self) -> Dict[Any, Dict[str, Any]]:
+        return self.levels.memory_report()
+
     def get_current_level(self, blstats: BLStats) -> Level:
         """
         :return: Level object of the current level
@@ -1,26 +1,126 @@
+from collections import Counter, deque
+from typing import Optional
+
 import gymnasium as gym
+import numpy as np
 from nle import nethack
 
 
 class NoProgressAbort(gym.Wrapper):
-    def __init__(self, env, no_progress_timeout: int = 150):
+    """
+    Aborts the episode when the game time stops advancing for `no_progress_timeout` steps.
+
+    Optionally also detects state cycles: once per game turn a hash of (glyphs, position, inventory)
+    is kept for the last `loop_window` turns, a state seen `loop_repeats` times within the window is a loop.
+    Monster glyphs are left out of the hash, a wandering pet shouldn't hide that the agent goes in circles.
+    Loops truncate the episode when `loop_truncate` is set, otherwise they are only flagged in info.
+    """
+
+    def __init__(
+        self,
+        env,
+        no_progress_timeout: int = 150,
+        loop_window: Optional[int] = None,
+        loop_repeats: int = 20,
+        loop_truncate: bool = True,
+    ):
         super().__init__(env)
         self.no_progress_timeout = no_progress_timeout
-        self.env._check_abort = self._check_abort
+        self.loop_window = loop_window
+        self.loop_repeats = loop_repeats
+        self.loop_truncate = loop_truncate
+        self.aborts = []
+
+        # nle calls _check_abort on itself, it has to be replaced on the unwrapped env
+        self.env.unwrapped._check_abort = self._check_abort
+        keys = self.env.unwrapped._observation_keys
+        self._glyphs_index = keys.index("glyphs")
+        self._inv_index = keys.index("inv_glyphs") if "inv_glyphs" in keys else None
 
     def reset(self, *args, **kwargs):
         self._turns = None
         self._no_progress_count = 0
+        self._states = deque()
+        self._state_counts = Counter()
+        self._loop_detected = False
+        self._abort_reason = None
         return self.env.reset(*args, **kwargs)
 
+    def step(self, action):
+        obs, reward, terminated, truncated, info = self.env.step(action)
+
+        if self._loop_detected:
+            info["loop_detected"] = True
+            self._loop_detected = False
+
+        if self._abort_reason is not None:
+            info["abort"] = self.aborts[-1]
+            self._abort_reason = None
+
+        return obs, reward, terminated, truncated, info
+
     def _check_abort(self, observation):
         """Check if time has stopped and no observations has changed long enough
         to trigger an abort."""
+        env = self.env.unwrapped
 
-        turns = observation[self.env._blstats_index][nethack.NLE_BL_TIME]
+        turns = observation[env._blstats_index][nethack.NLE_BL_TIME]
         if self._turns == turns:
             self._no_progress_count += 1
         else:
             self._turns = turns
             self._no_progress_count = 0
-        return self.env._steps >= self.env._max_episode_steps or self._no_progress_count >= self.no_progress_timeout
+            if self.loop_window is not None and self._update_states(observation):
+                self._loop_detected = True
+
+        if env._steps >= env._max_episode_steps:
+            return True
+        if self._no_progress_count >= self.no_progress_timeout:
+            return self._abort("no_progress")
+        if self._loop_detected and self.loop_truncate:
+            return self._abort("loop")
+        return False
+
+    def _update_states(self, observation) -> bool:
+        """
+        Adds the current state to the rolling window, returns True if it repeats often enough to be a loop.
+        """
+        env = self.env.unwrapped
+        blstats = observation[env._blstats_index]
+        inventory = observation[self._inv_index].tobytes() if self._inv_index is not None else b""
+        glyphs = observation[self._glyphs_index]
+        monsters = (glyphs >= nethack.GLYPH_MON_OFF) & (glyphs < nethack.GLYPH_INVIS_OFF)
+        state = hash(
+            (
+                np.where(monsters, nethack.GLYPH_MON_OFF, glyphs).tobytes(),
+                int(blstats[nethack.NLE_BL_X]),
+                int(blstats[nethack.NLE_BL_Y]),
+                inventory,
+            )
+        )
+
+        self._states.append(state)
+        self._state_counts[state] += 1
+        if len(self._states) > self.loop_window:
+            old = self._states.popleft()
+            self._state_counts[old] -= 1
+            if self._state_counts[old] == 0:
+                del self._state_counts[old]
+
+        return self._state_counts[state] >= self.loop_repeats
+
+    def _abort(self, reason: str) -> bool:
+        env = self.env.unwrapped
+        self._abort_reason = reason
+        self.aborts.append(
+            {
+                "reason": reason,
+                "step": env._steps,
+                "steps_saved": env._max_episode_steps - env._steps,
+            }
+        )
+        return True
+
+    @property
+    def steps_saved(self) -> int:
+        return sum(abort["steps_saved"] for abort in self.aborts)
@@ -1,18 +1,25 @@
+from typing import Optional
+
 import gymnasium as gym
 from nle.nethack import actions as A
 
 from nle_interface_wrapper.wrappers.properties.blstats import BLStats
+from nle_interface_wrapper.wrappers.reset_cache import ResetCache
 
 
 class AddTextOverview(gym.Wrapper):
-    def __init__(self, env):
+    def __init__(self, env, reset_cache: Optional[ResetCache] = None):
         super().__init__(env)
+        self.reset_cache = reset_cache
 
     def reset(self, **kwargs):
         obs, info = self.env.reset(**kwargs)
 
         self.overview = {}
-        self.cache_overview()
+        if self.reset_cache is not None:
+            self.overview = self.reset_cache.load(self, "overview", kwargs.get("seed"), self.parse_initial_overview)
+        else:
+            self.cache_overview()
 
         return self.populate_obs(obs), info
 
@@ -21,7 +28,8 @@ class AddTextOverview(gym.Wrapper):
 
         blstats: BLStats = self.env.get_wrapper_attr("blstats")
         # update the overview when we go to a new level
-        if (blstats.dungeon_number, blstats.depth) != (self.overview["dungeon_number"], self.overview["depth"]):
+        level = (blstats.dungeon_number, blstats.depth)
+        if not (terminated or truncated) and level != (self.overview["dungeon_number"], self.overview["depth"]):
             self.cache_overview()
 
         return self.populate_obs(obs), reward, terminated, truncated, info
@@ -40,5 +48,9 @@ class AddTextOverview(gym.Wrapper):
             "depth": blstats.depth,
         }
 
+    def parse_initial_overview(self):
+        self.cache_overview()
+        return self.overview
+
     def get_cached_overview(self):
         return self.overview["message"] if self.overview else ""
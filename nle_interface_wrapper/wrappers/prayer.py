@@ -1,7 +1,29 @@
-import re
-
 import gymnasium as gym
 
+from nle_interface_wrapper.wrappers.properties.message_events import MESSAGE_EVENTS
+
+MESSAGE_EVENTS.register("prayer_finished", r"You finish your prayer\.")
+MESSAGE_EVENTS.register(
+    "god_angry",
+    r"(?:Thou hast angered me\."
+    r"|Thou shalt pay, infidel\."
+    r"|How darest thou desecrate my altar!"
+    r"|Vile creature, thou durst call upon me\?"
+    r"|Walk no more, perversion of nature!"
+    r"|I believe it not!"
+    r"|So, mortal! You dare desecrate my High Temple!"
+    r"|Suffer, infidel!"
+    r"|Thou must relearn thy lessons!"
+    r"|Thou durst scorn me\?"
+    r"|Thou durst call upon me\?"
+    r"|You feel that .+ is displeased.)",
+)
+# kept apart from god_angry, a leading wildcard would shadow other events starting at the same position
+MESSAGE_EVENTS.register("not_deterred", r".+ is not deterred")
+MESSAGE_EVENTS.register(
+    "god_mollified", r"(?:have a feeling of reconciliation" r"|have a hopeful feeling" r"|seems mollified)"
+)
+
 
 class AddTextPrayer(gym.Wrapper):
     def __init__(self, env):
@@ -23,31 +45,13 @@ class AddTextPrayer(gym.Wrapper):
         return self.populate_obs(obs), reward, terminated, truncated, info
 
     def update(self):
-        if "You finish your prayer." in self.message:
+        if "prayer_finished" in self.message_events:
             self.last_prayer = self.blstats.time
 
-        angry_regex = (
-            r"(?:Thou hast angered me\."
-            r"|Thou shalt pay, infidel\."
-            r"|How darest thou desecrate my altar!"
-            r"|Vile creature, thou durst call upon me\?"
-            r"|Walk no more, perversion of nature!"
-            r"|I believe it not!"
-            r"|So, mortal! You dare desecrate my High Temple!"
-            r"|Suffer, infidel!"
-            r"|Thou must relearn thy lessons!"
-            r"|Thou durst scorn me\?"
-            r"|Thou durst call upon me\?"
-            r"|You feel that .+ is displeased."
-            r"|.+ is not deterred)"
-        )
-
-        if re.search(angry_regex, self.message):
+        if "god_angry" in self.message_events or "not_deterred" in self.message_events:
             self.angry = True
 
-        no_angry_regex = r"(?:have a feeling of reconciliation" r"|have a hopeful feeling" r"|seems mollified)"
-
-        if re.search(no_angry_regex, self.message):
+        if "god_mollified" in self.message_events:
             self.angry = False
 
     def populate_obs(self, obs):
@@ -0,0 +1,74 @@
+from typing import Any, Dict, Sequence, Tuple
+
+import numpy as np
+from nle import nethack
+from numpy import ndarray
+
+from nle_interface_wrapper.wrappers.properties.blstats import BatchedBLStats, BLStats, decode_conditions
+from nle_interface_wrapper.wrappers.properties.category import GC, classify, has
+from nle_interface_wrapper.wrappers.properties.entity import GLYPH_ENTITY
+
+
+def entity_tables(glyphs: ndarray, glyph_categories: ndarray, blstats: ndarray) -> Tuple[ndarray, ndarray]:
+    """
+    Entity tables of all envs stacked into one ENTITY_DTYPE array, the players excluded.
+
+    Returns:
+        the table and the (N + 1,) offsets, rows of env i are table[offsets[i] : offsets[i + 1]]
+    """
+    num_envs = len(glyphs)
+    monster_mask = has(glyph_categories, GC.MONS | GC.INVISIBLE_MON)
+    monster_mask[np.arange(num_envs), blstats[:, nethack.NLE_BL_Y], blstats[:, nethack.NLE_BL_X]] = False
+
+    envs, ys, xs = np.nonzero(monster_mask)
+    table = GLYPH_ENTITY[glyphs[envs, ys, xs]]
+    table["y"] = ys
+    table["x"] = xs
+    offsets = np.searchsorted(envs, np.arange(num_envs + 1))
+    return table, offsets
+
+
+class BatchedProperties:
+    """
+    Properties of N envs computed from stacked (N, 21, 79) glyphs and (N, 27) blstats in one pass.
+
+    Per env results are slices (views) of the batched arrays. prime(i, properties) hands them to the Properties
+    wrapper of env i for the current step, so its derived fields aren't computed again.
+    """
+
+    def __init__(self, glyphs: ndarray, blstats: ndarray):
+        self.glyphs = glyphs
+        self.blstats = BatchedBLStats(blstats)
+        self.glyph_categories = classify(glyphs)
+        self.entity_table, self.offsets = entity_tables(glyphs, self.glyph_categories, blstats)
+        self.conditions = decode_conditions(self.blstats.prop_mask)
+
+    @classmethod
+    def from_wrappers(cls, wrappers: Sequence) -> "BatchedProperties":
+        """
+        Batches the current observations of the Properties wrappers of several envs and primes every wrapper.
+        """
+        glyphs = np.stack([wrapper.obs["glyphs"] for wrapper in wrappers])
+        blstats = np.stack([wrapper.obs["blstats"] for wrapper in wrappers])
+        batch = cls(glyphs, blstats)
+        for i, wrapper in enumerate(wrappers):
+            batch.prime(i, wrapper)
+        return batch
+
+    def __len__(self) -> int:
+        return len(self.glyphs)
+
+    def env_entity_table(self, i: int) -> ndarray:
+        return self.entity_table[self.offsets[i] : self.offsets[i + 1]]
+
+    def fields(self, i: int) -> Dict[str, Any]:
+        return {
+            "blstats": BLStats(self.blstats.array[i]),
+            "glyphs": self.glyphs[i],
+            "glyph_categories": self.glyph_categories[i],
+            "entity_table": self.env_entity_table(i),
+            "conditions": {name: bool(flags[i]) for name, flags in self.conditions.items()},
+        }
+
+    def prime(self, i: int, properties) -> None:
+        properties.prime(**self.fields(i))
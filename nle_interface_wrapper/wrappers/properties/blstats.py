@@ -1,6 +1,135 @@
-from collections import namedtuple
+from typing import Dict, Iterator, Tuple
 
-BLStats = namedtuple(
-    "BLStats",
-    "x y strength_percentage strength dexterity constitution intelligence wisdom charisma score hitpoints max_hitpoints depth gold energy max_energy armor_class monster_level experience_level experience_points time hunger_state carrying_capacity dungeon_number level_number prop_mask align_bits",
-)
+import numpy as np
+from nle import nethack
+from numpy import ndarray
+
+BLSTATS_FIELDS = (
+    "x y strength_percentage strength dexterity constitution intelligence wisdom charisma score hitpoints "
+    "max_hitpoints depth gold energy max_energy armor_class monster_level experience_level experience_points time "
+    "hunger_state carrying_capacity dungeon_number level_number prop_mask align_bits"
+).split()
+
+# status conditions encoded in prop_mask
+CONDITIONS = {
+    "stone": nethack.BL_MASK_STONE,
+    "slime": nethack.BL_MASK_SLIME,
+    "strngl": nethack.BL_MASK_STRNGL,
+    "foodpois": nethack.BL_MASK_FOODPOIS,
+    "termill": nethack.BL_MASK_TERMILL,
+    "blind": nethack.BL_MASK_BLIND,
+    "deaf": nethack.BL_MASK_DEAF,
+    "stun": nethack.BL_MASK_STUN,
+    "conf": nethack.BL_MASK_CONF,
+    "hallu": nethack.BL_MASK_HALLU,
+    "lev": nethack.BL_MASK_LEV,
+    "fly": nethack.BL_MASK_FLY,
+    "ride": nethack.BL_MASK_RIDE,
+}
+CONDITION_MASKS = np.array(list(CONDITIONS.values()), np.int64)
+
+
+def decode_conditions(prop_mask) -> Dict[str, ndarray]:
+    """
+    Decodes all conditions at once, works for a single prop_mask and for an array of them.
+    """
+    flags = (np.asarray(prop_mask)[..., None] & CONDITION_MASKS) != 0
+    return {name: flags[..., i] for i, name in enumerate(CONDITIONS)}
+
+
+def _readonly_view(array: ndarray) -> ndarray:
+    view = array.view()
+    view.flags.writeable = False
+    return view
+
+
+class BLStats:
+    """
+    Read-only view over a blstats array, fields are read from the array on access without copying it.
+
+    nle reuses its observation buffers, so a view follows the game. Use copy() to keep the values of a step
+    and snapshot() for a hashable tuple of them, the view itself isn't hashable.
+    Behaves like the namedtuple it replaces: iteration, indexing, len, _fields and _asdict.
+    """
+
+    __slots__ = ("array",)
+    _fields = tuple(BLSTATS_FIELDS)
+
+    def __init__(self, array: ndarray):
+        assert array.shape == (len(BLSTATS_FIELDS),), array.shape
+        self.array = _readonly_view(array)
+
+    def copy(self) -> "BLStats":
+        return BLStats(self.array.copy())
+
+    def snapshot(self) -> Tuple[int, ...]:
+        return tuple(self.array.tolist())
+
+    def condition(self, name: str) -> bool:
+        return bool(self.prop_mask & CONDITIONS[name])
+
+    @property
+    def conditions(self) -> Dict[str, bool]:
+        return {name: bool(flag) for name, flag in decode_conditions(self.prop_mask).items()}
+
+    def _asdict(self) -> Dict[str, np.int64]:
+        return dict(zip(self._fields, self.array))
+
+    def __getitem__(self, index):
+        return self.array[index]
+
+    def __iter__(self) -> Iterator[np.int64]:
+        return iter(self.array)
+
+    def __len__(self) -> int:
+        return len(self.array)
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, BLStats):
+            return np.array_equal(self.array, other.array)
+        if isinstance(other, tuple):
+            return tuple(self.array) == other
+        return NotImplemented
+
+    # its values change with the game, use snapshot() as a key
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f"BLStats({', '.join(f'{k}={v}' for k, v in zip(self._fields, self.array))})"
+
+
+class BatchedBLStats:
+    """
+    Read-only view over the (num_envs, 27) blstats of a vector env, fields are column views.
+    """
+
+    __slots__ = ("array",)
+    _fields = tuple(BLSTATS_FIELDS)
+
+    def __init__(self, array: ndarray):
+        assert array.ndim == 2 and array.shape[1] == len(BLSTATS_FIELDS), array.shape
+        self.array = _readonly_view(array)
+
+    def copy(self) -> "BatchedBLStats":
+        return BatchedBLStats(self.array.copy())
+
+    def condition(self, name: str) -> ndarray:
+        return (self.prop_mask & CONDITIONS[name]) != 0
+
+    @property
+    def conditions(self) -> Dict[str, ndarray]:
+        return decode_conditions(self.prop_mask)
+
+    def __getitem__(self, index) -> BLStats:
+        return BLStats(self.array[index])
+
+    def __iter__(self) -> Iterator[BLStats]:
+        return (BLStats(row) for row in self.array)
+
+    def __len__(self) -> int:
+        return len(self.array)
+
+
+for _index, _name in enumerate(BLSTATS_FIELDS):
+    setattr(BLStats, _name, property(lambda self, i=_index: self.array[i]))
+    setattr(BatchedBLStats, _name, property(lambda self, i=_index: self.array[:, i]))
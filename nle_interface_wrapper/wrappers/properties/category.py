@@ -0,0 +1,55 @@
+import numba as nb
+import numpy as np
+from nle import nethack as nh
+from numpy import ndarray
+
+from nle_interface_wrapper.wrappers.properties.glyph import SS, G
+
+# every glyph set of G gets a bit, plus the sets which are only used for masks
+CATEGORY_SETS = {
+    **G.DICT,
+    "ROOM_FLOOR": frozenset({SS.S_room, SS.S_darkroom}),
+    "CORRIDOR": frozenset({SS.S_corr, SS.S_litcorr}),
+    "NO_DOOR": frozenset({SS.S_ndoor}),
+    "LIQUID": frozenset({SS.S_lava, SS.S_water}),
+}
+assert len(CATEGORY_SETS) <= 64
+
+
+class GC:  # glyph categories, uint64 bits named like the glyph sets of G
+    pass
+
+
+GLYPH_CATEGORIES = np.zeros(nh.MAX_GLYPH, np.uint64)
+for bit, (name, glyphs) in enumerate(CATEGORY_SETS.items()):
+    setattr(GC, name, np.uint64(1 << bit))
+    GLYPH_CATEGORIES[list(glyphs)] |= np.uint64(1 << bit)
+
+
+@nb.njit("u8[:,:](i2[:,:],u8[:])", cache=True)
+def _classify_kernel(array, lut):
+    ret = np.zeros(array.shape, dtype=nb.u8)
+    for y in range(array.shape[0]):
+        for x in range(array.shape[1]):
+            if 0 <= array[y, x] < lut.shape[0]:
+                ret[y, x] = lut[array[y, x]]
+    return ret
+
+
+def classify(array: ndarray) -> ndarray:
+    """
+    Category bits of every glyph in the array, in a single pass. Values which aren't glyphs (e.g. -1) get no bits.
+    Stacked maps, e.g. (N, 21, 79) glyphs of a vector env, are classified in the same single kernel call.
+    """
+    assert array.dtype == np.int16 and array.ndim >= 2
+    if array.ndim == 2:
+        return _classify_kernel(array, GLYPH_CATEGORIES)
+    rows = array.reshape(-1, array.shape[-1])
+    return _classify_kernel(rows, GLYPH_CATEGORIES).reshape(array.shape)
+
+
+def has(categories: ndarray, bits: np.uint64) -> ndarray:
+    """
+    Mask of the cells with any of the category bits, e.g. has(categories, GC.FLOOR | GC.TRAPS).
+    """
+    return (categories & bits) != 0
@@ -1,7 +1,52 @@
 from typing import Any, Tuple
 
+import numpy as np
 from nle import nethack
 
+from nle_interface_wrapper.wrappers.properties.monster import GLYPH_MONSTER, PERMONST
+
+ENTITY_DTYPE = np.dtype(
+    [
+        ("y", np.int16),
+        ("x", np.int16),
+        ("glyph", np.int16),
+        ("mon_id", np.int16),
+        ("difficulty", np.int16),
+        ("ac", np.int16),
+        ("cnutrit", np.int16),
+        ("pet", bool),
+    ]
+)
+
+
+def _glyph_entity_table() -> np.ndarray:
+    """
+    Entity attributes of every glyph, -1 for glyphs which aren't monsters.
+    """
+    is_monster = np.array([nethack.glyph_is_monster(glyph) for glyph in range(nethack.MAX_GLYPH)])
+
+    table = np.zeros(nethack.MAX_GLYPH, ENTITY_DTYPE)
+    table["glyph"] = np.arange(nethack.MAX_GLYPH)
+    for field in ("mon_id", "difficulty", "ac", "cnutrit"):
+        table[field] = np.where(is_monster, GLYPH_MONSTER[field], -1)
+    table["pet"] = [nethack.glyph_is_pet(glyph) for glyph in range(nethack.MAX_GLYPH)]
+    return table
+
+
+GLYPH_ENTITY = _glyph_entity_table()
+
+
+def entity_table(glyphs: np.ndarray, mask: np.ndarray) -> np.ndarray:
+    """
+    Returns:
+        ENTITY_DTYPE array with a row for every position in the mask, in row-major order
+    """
+    ys, xs = np.nonzero(mask)
+    table = GLYPH_ENTITY[glyphs[ys, xs]]
+    table["y"] = ys
+    table["x"] = xs
+    return table
+
 
 class Entity:
     def __init__(self, position: Tuple[int, int], glyph: int) -> None:
@@ -16,14 +61,20 @@ class Entity:
         self.ac = self.permonst.ac if self.permonst else None
         self.cnutrit = self.permonst.cnutrit if self.permonst else None
 
+    @classmethod
+    def from_table(cls, row) -> "Entity":
+        """
+        Entity view of a row of an entity table.
+        """
+        return cls((row["y"], row["x"]), row["glyph"])
+
     def get_permonst(self, glyph: int) -> str:
         """
         Get the monster name from the glyph.
         """
-        if nethack.glyph_is_monster(glyph):
-            mon_id = nethack.glyph_to_mon(glyph)
-            mon = nethack.permonst(mon_id)
-            return mon
+        mon_id = GLYPH_ENTITY["mon_id"][glyph]
+        if mon_id >= 0:
+            return PERMONST[mon_id]
         return None
 
     def __eq__(self, other: Any) -> bool:
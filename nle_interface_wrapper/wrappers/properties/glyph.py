@@ -2,6 +2,9 @@ import functools
 
 import nle.nethack as nh
 
+from nle_interface_wrapper.wrappers.properties.monster import GLYPH_MON_ID, MONSTER_NAMES, PERMONST
+from nle_interface_wrapper.wrappers.properties.utils import isin_mask
+
 
 class SS:  # screen_symbols
     S_stone = nh.GLYPH_CMAP_OFF + 0  #
@@ -385,16 +388,10 @@ class MON:  # monsters, pets
         return nh.glyph_is_pet(glyph)
 
     @staticmethod
-    @functools.lru_cache(nh.NUMMONS * 10)
     def permonst(glyph):
-        if nh.glyph_is_monster(glyph):
-            return nh.permonst(nh.glyph_to_mon(glyph))
-        elif nh.glyph_is_pet(glyph):
-            return nh.permonst(nh.glyph_to_pet(glyph))
-        elif nh.glyph_is_body(glyph):
-            return nh.permonst(glyph - nh.GLYPH_BODY_OFF)
-        else:
-            assert 0, glyph
+        mon_id = GLYPH_MON_ID[glyph]
+        assert mon_id >= 0, glyph
+        return PERMONST[mon_id]
 
     @staticmethod
     def find(glyph):
@@ -410,10 +407,8 @@ class MON:  # monsters, pets
     @staticmethod
     @functools.lru_cache(nh.NUMMONS)
     def id_from_name(name):
-        for i in range(nh.NUMMONS):
-            if nh.permonst(i).mname == name:
-                return i
-        assert 0, name
+        assert name in MONSTER_NAMES, name
+        return MONSTER_NAMES.index(name)
 
     @staticmethod
     def body_from_name(name):
@@ -641,3 +636,5 @@ class G:  # Glyphs
 
 
 G.INV_DICT = {i: [k for k, v in G.DICT.items() if i in v] for i in set.union(*map(set, G.DICT.values()))}
+# pre-registered isin handles of the glyph sets, e.g. isin(glyphs, G.MASKS["FLOOR"])
+G.MASKS = {name: isin_mask(glyphs) for name, glyphs in G.DICT.items() if glyphs}
@@ -0,0 +1,94 @@
+from typing import Dict, List
+
+import numpy as np
+
+from nle_interface_wrapper.wrappers.properties.message_events import MESSAGE_EVENTS, MessageEvent
+
+# https://nethackwiki.com/wiki/You_feel, (gained, lost) messages of the intrinsics which can be tracked from messages
+INTRINSIC_MESSAGES = {
+    "fire resistance": (r"You feel a momentary chill\.", r"You feel warmer\."),
+    "cold resistance": (r"You feel full of hot air\.", r"You feel cooler\."),
+    "poison resistance": (r"You feel (?:especially )?healthy\.", r"You feel a little sick!"),
+    "sleep resistance": (r"You feel wide awake\.", r"You feel tired!"),
+    "shock resistance": (r"Your health currently feels amplified!", r"You feel conductive\."),
+    "disintegration resistance": (r"You feel very firm\.", None),
+    "telepathy": (r"You feel a strange mental acuity\.", r"Your senses fail!"),
+    "teleportitis": (r"You feel very jumpy\.", r"You feel less jumpy\."),
+    "teleport control": (
+        r"You feel (?:in control of yourself|centered in your personal space)\.",
+        r"You feel (?:uncontrolled|less in control of yourself)!",
+    ),
+    "speed": (r"You feel quick!", r"You feel slow!"),
+    "stealth": (r"You feel stealthy!", r"You feel clumsy\."),
+    "searching": (r"You feel perceptive!", r"You feel less perceptive!"),
+    "warning": (r"You feel sensitive!", r"You feel insensitive!"),
+    "invisible": (r"Gee!\s+All of a sudden, you can't see yourself\.", r"Your body seems to unfade\."),
+    "see invisible": (r"You can see through yourself, but you are visible!", None),
+    "lycanthropy": (r"You feel feverish\.", r"You feel purified\."),
+}
+INTRINSICS = list(INTRINSIC_MESSAGES)
+assert len(INTRINSICS) <= 64
+
+# event name -> (intrinsic index, gained)
+INTRINSIC_EVENTS = {}
+for _index, (_name, _patterns) in enumerate(INTRINSIC_MESSAGES.items()):
+    for _gained, _pattern in zip((True, False), _patterns):
+        if _pattern is None:
+            continue
+        _event = f"{_name.replace(' ', '_')}_{'gained' if _gained else 'lost'}"
+        MESSAGE_EVENTS.register(_event, _pattern)
+        INTRINSIC_EVENTS[_event] = (_index, _gained)
+
+TIMELINE_DTYPE = np.dtype([("time", np.int32), ("intrinsic", np.int8), ("gained", bool)])
+
+
+class Intrinsics:
+    """
+    Intrinsics inferred from messages. Current state is a bitset over INTRINSICS, every change is appended to
+    a timeline of (time, intrinsic, gained) records. Messages are matched by the shared MESSAGE_EVENTS scan,
+    which only runs the patterns whose indexed words occur in the message, so most messages run none of these.
+    """
+
+    def __init__(self, capacity: int = 64):
+        self.bits = 0
+        self.timeline = np.zeros(capacity, TIMELINE_DTYPE)
+        self.length = 0
+
+    def update(self, message_events: Dict[str, List[MessageEvent]], time: int):
+        for event in message_events:
+            if event in INTRINSIC_EVENTS:
+                index, gained = INTRINSIC_EVENTS[event]
+                self.set(index, gained, time)
+
+    def set(self, index: int, gained: bool, time: int):
+        if gained:
+            self.bits |= 1 << index
+        else:
+            self.bits &= ~(1 << index)
+
+        if self.length == len(self.timeline):
+            self.timeline = np.resize(self.timeline, 2 * len(self.timeline))
+        self.timeline[self.length] = (time, index, gained)
+        self.length += 1
+
+    def has(self, name: str) -> bool:
+        return bool(self.bits >> INTRINSICS.index(name) & 1)
+
+    @property
+    def current(self) -> List[str]:
+        return [name for index, name in enumerate(INTRINSICS) if self.bits >> index & 1]
+
+    @property
+    def events(self) -> np.ndarray:
+        return self.timeline[: self.length]
+
+    def acquired(self, name: str) -> int:
+        """
+        Turn at which the intrinsic was last gained, -1 if it was never gained.
+        """
+        events = self.events
+        times = events["time"][(events["intrinsic"] == INTRINSICS.index(name)) & events["gained"]]
+        return int(times[-1]) if len(times) else -1
+
+    def __str__(self):
+        return "\n".join(f"{name} (since turn {self.acquired(name)})" for name in self.current)
@@ -0,0 +1,133 @@
+import re
+from collections import defaultdict, namedtuple
+from typing import Dict, FrozenSet, List, Optional, Set, Tuple
+
+try:
+    from re import _parser as sre_parse
+except ImportError:  # python < 3.11
+    import sre_parse
+
+MessageEvent = namedtuple("MessageEvent", ["name", "text", "groups"])
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def _literal_words(run: str) -> List[str]:
+    """
+    Words of a literal run which are whole words of every message the run matches in, i.e. the words which have
+    a separator on both sides inside the run.
+    """
+    words = []
+    for match in _WORD.finditer(run):
+        if match.start() > 0 and match.end() < len(run):
+            words.append(match.group())
+    return words
+
+
+def _required_keys(items) -> Optional[FrozenSet[Tuple[str, str]]]:
+    """
+    Keys of which every match of the parsed pattern contains at least one, None if there are none.
+    Keys are ("word", word) for whole words and ("text", text) for literal text which may be part of a word.
+    Prefers words, then the longest and fewest keys.
+    """
+    candidates = []
+    run = []
+
+    def flush():
+        text = "".join(run).lower()
+        words = _literal_words(text)
+        candidates.extend(frozenset([("word", word)]) for word in words)
+        if not words and len(text.strip()) >= 3:
+            candidates.append(frozenset([("text", text)]))
+        run.clear()
+
+    for op, av in items:
+        if op is sre_parse.LITERAL:
+            run.append(chr(av))
+            continue
+        flush()
+        if op is sre_parse.SUBPATTERN:
+            required = _required_keys(av[-1])
+        elif op is sre_parse.BRANCH:
+            branches = [_required_keys(branch) for branch in av[1]]
+            required = None if any(b is None for b in branches) else frozenset().union(*branches)
+        elif op in (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT) and av[0] >= 1:
+            required = _required_keys(av[2])
+        else:
+            required = None
+        if required:
+            candidates.append(required)
+    flush()
+
+    if not candidates:
+        return None
+    return min(
+        candidates,
+        key=lambda keys: (any(kind == "text" for kind, _ in keys), -min(len(key) for _, key in keys), len(keys)),
+    )
+
+
+class MessageEvents:
+    """
+    Registry of tracked messages.
+
+    Every pattern is indexed by words one of which any of its matches contains. A scan splits the message into words
+    and only runs the patterns indexed by them, so the cost per message doesn't grow with the number of tracked
+    events. Patterns without such words are keyed by literal text checked with `in`, patterns without any literal
+    (e.g. only wildcards) run on every message.
+    """
+
+    def __init__(self):
+        self.patterns: Dict[str, str] = {}
+        self.regexes: Dict[str, re.Pattern] = {}
+        self.index: Dict[str, List[str]] = defaultdict(list)
+        self.texts: Dict[str, List[str]] = defaultdict(list)
+        self.unindexed: List[str] = []
+
+    def register(self, name: str, pattern: str):
+        """
+        Registers event `name`, patterns may use unnamed capturing groups which end up in `MessageEvent.groups`.
+        """
+        if self.patterns.get(name) == pattern:
+            return
+        assert name not in self.patterns, f"Event {name} already registered with a different pattern"
+
+        self.patterns[name] = pattern
+        self.regexes[name] = re.compile(pattern)
+        keys = _required_keys(sre_parse.parse(pattern))
+        if keys is None:
+            self.unindexed.append(name)
+            return
+        for kind, key in keys:
+            (self.index if kind == "word" else self.texts)[key].append(name)
+
+    def candidates(self, message: str) -> Set[str]:
+        """
+        Events which may occur in the message.
+        """
+        message = message.lower()
+        names = set(self.unindexed)
+        for word in set(_WORD.findall(message)):
+            names.update(self.index.get(word, ()))
+        for text, text_names in self.texts.items():
+            if text in message:
+                names.update(text_names)
+        return names
+
+    def scan(self, message: str) -> Dict[str, List[MessageEvent]]:
+        events = defaultdict(list)
+        if not message or not self.patterns:
+            return events
+
+        found = []
+        for name in self.candidates(message):
+            for match in self.regexes[name].finditer(message):
+                found.append((match.start(), name, MessageEvent(name, match.group(), match.groups())))
+
+        # events in the order they appear in the message
+        for _, name, event in sorted(found, key=lambda item: item[:2]):
+            events[name].append(event)
+        return events
+
+
+MESSAGE_EVENTS = MessageEvents()
@@ -0,0 +1,70 @@
+import numpy as np
+from nle import nethack
+
+MONSTER_DTYPE = np.dtype(
+    [
+        ("mon_id", np.int16),
+        ("mname", np.int16),
+        ("difficulty", np.int16),
+        ("ac", np.int16),
+        ("cnutrit", np.int16),
+        ("cwt", np.int16),
+        ("mflags1", np.uint32),
+        ("mflags2", np.uint32),
+        ("mflags3", np.uint32),
+        ("mresists", np.uint8),
+    ]
+)
+
+PERMONST = [nethack.permonst(mon_id) for mon_id in range(nethack.NUMMONS)]
+MONSTER_NAMES = [permonst.mname for permonst in PERMONST]
+# were creatures share the name of their animal and human form, the later (human) form wins
+NAME_TO_MON_ID = {name: mon_id for mon_id, name in enumerate(MONSTER_NAMES)}
+# nle returns a new permonst object on every call, (mname, mlet) tells all of them apart
+PERMONST_TO_MON_ID = {(permonst.mname, permonst.mlet): mon_id for mon_id, permonst in enumerate(PERMONST)}
+
+
+def _monster_table() -> np.ndarray:
+    """
+    Attributes of every monster, indexed by mon id.
+    """
+    table = np.zeros(nethack.NUMMONS, MONSTER_DTYPE)
+    for mon_id, permonst in enumerate(PERMONST):
+        table[mon_id] = (
+            mon_id,
+            mon_id,
+            permonst.difficulty,
+            permonst.ac,
+            permonst.cnutrit,
+            permonst.cwt,
+            permonst.mflags1,
+            permonst.mflags2,
+            permonst.mflags3,
+            permonst.mresists,
+        )
+    return table
+
+
+def _glyph_mon_id() -> np.ndarray:
+    """
+    Mon id of every monster, pet, corpse and statue glyph, -1 for other glyphs.
+    """
+    mon_ids = np.full(nethack.MAX_GLYPH, -1, np.int16)
+    for glyph in range(nethack.MAX_GLYPH):
+        if nethack.glyph_is_monster(glyph):
+            mon_ids[glyph] = nethack.glyph_to_mon(glyph)
+        elif nethack.glyph_is_body(glyph):
+            mon_ids[glyph] = glyph - nethack.GLYPH_BODY_OFF
+        elif nethack.glyph_is_statue(glyph):
+            mon_ids[glyph] = glyph - nethack.GLYPH_STATUE_OFF
+    return mon_ids
+
+
+MONSTERS = _monster_table()
+GLYPH_MON_ID = _glyph_mon_id()
+
+# dense per glyph copy of MONSTERS, glyphs without a monster have mon_id -1 and zeroed attributes
+GLYPH_MONSTER = MONSTERS[GLYPH_MON_ID]
+GLYPH_MONSTER[GLYPH_MON_ID < 0] = 0
+GLYPH_MONSTER["mon_id"][GLYPH_MON_ID < 0] = -1
+GLYPH_MONSTER["mname"][GLYPH_MON_ID < 0] = -1
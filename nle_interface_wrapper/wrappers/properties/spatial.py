@@ -0,0 +1,183 @@
+from typing import Dict, Optional, Tuple
+
+import numba as nb
+import numpy as np
+from numpy import ndarray
+
+from nle_interface_wrapper.wrappers.properties.category import GC, has
+
+# glyphs the player can stand on, monsters and items lie on walkable cells
+WALKABLE = (
+    GC.FLOOR
+    | GC.STAIR_UP
+    | GC.STAIR_DOWN
+    | GC.DOOR_OPENED
+    | GC.TRAPS
+    | GC.ALTAR
+    | GC.FOUNTAIN
+    | GC.SINK
+    | GC.THRONE
+    | GC.GRAVE
+    | GC.MONS
+    | GC.PETS
+    | GC.INVISIBLE_MON
+    | GC.BODIES
+    | GC.OBJECTS
+    | GC.STATUES
+)
+OBJECTS = GC.OBJECTS | GC.BODIES | GC.STATUES | GC.BOULDER
+
+# (dy, dx) of the 8 neighbors of a cell, shared by the distance kernels of the spatial index and the level map
+NEIGHBORS = np.array([(-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1)], np.int64)
+
+
+@nb.njit("i4[:,:](b1[:,:],b1[:,:],i8,i8,i8[:,:])", cache=True)
+def _distance_kernel(walkable, doors, y, x, neighbors):
+    dist = np.full(walkable.shape, -1, dtype=nb.i4)
+    queue = np.empty((walkable.size, 2), dtype=nb.i8)
+    dist[y, x] = 0
+    queue[0, 0] = y
+    queue[0, 1] = x
+    head = 0
+    tail = 1
+    while head < tail:
+        cy = queue[head, 0]
+        cx = queue[head, 1]
+        head += 1
+        for i in range(neighbors.shape[0]):
+            ny = cy + neighbors[i, 0]
+            nx = cx + neighbors[i, 1]
+            if ny < 0 or ny >= walkable.shape[0] or nx < 0 or nx >= walkable.shape[1]:
+                continue
+            if dist[ny, nx] >= 0 or not walkable[ny, nx]:
+                continue
+            # open doors can't be entered or left diagonally
+            if neighbors[i, 0] != 0 and neighbors[i, 1] != 0 and (doors[cy, cx] or doors[ny, nx]):
+                continue
+            dist[ny, nx] = dist[cy, cx] + 1
+            queue[tail, 0] = ny
+            queue[tail, 1] = nx
+            tail += 1
+    return dist
+
+
+def distance_field(walkable: ndarray, doors: ndarray, origin: Tuple[int, int]) -> ndarray:
+    """
+    Walking distance (8-connected, no diagonal moves through open doors) from origin to every cell, -1 if unreachable.
+    """
+    return _distance_kernel(walkable, doors, int(origin[0]), int(origin[1]), NEIGHBORS)
+
+
+class SpatialIndex:
+    """
+    Per-step index of the monsters (entity table rows) and objects on the map.
+
+    Every kind keeps the positions of its members and a grid mapping cells to member indices (-1 for empty cells),
+    so radius and adjacency queries under the Chebyshev metric only look at a window of the grid.
+    With metric="path" distances are walking distances, fields are computed once per origin and reused.
+    """
+
+    def __init__(self, glyph_categories: ndarray, entity_table: ndarray):
+        self.glyph_categories = glyph_categories
+        self.entity_table = entity_table
+        self._positions: Dict[str, ndarray] = {}
+        self._grids: Dict[str, ndarray] = {}
+        self._walkable = None
+        self._doors = None
+        self._fields: Dict[Tuple[int, int], ndarray] = {}
+
+    @property
+    def walkable(self) -> ndarray:
+        if self._walkable is None:
+            self._walkable = has(self.glyph_categories, WALKABLE)
+            self._doors = has(self.glyph_categories, GC.DOOR_OPENED)
+        return self._walkable
+
+    def positions(self, kind: str = "monsters") -> ndarray:
+        """
+        (N, 2) array with the (y, x) positions of the members of kind, "monsters" follow the entity table order.
+        """
+        if kind not in self._positions:
+            if kind == "monsters":
+                positions = np.stack([self.entity_table["y"], self.entity_table["x"]], axis=1).astype(np.int64)
+            elif kind == "objects":
+                positions = np.argwhere(has(self.glyph_categories, OBJECTS))
+            else:
+                raise ValueError(f"Unknown kind {kind}")
+            self._positions[kind] = positions
+        return self._positions[kind]
+
+    def grid(self, kind: str = "monsters") -> ndarray:
+        if kind not in self._grids:
+            positions = self.positions(kind)
+            grid = np.full(self.glyph_categories.shape, -1, np.int32)
+            grid[positions[:, 0], positions[:, 1]] = np.arange(len(positions))
+            self._grids[kind] = grid
+        return self._grids[kind]
+
+    def distance_field(self, origin: Tuple[int, int]) -> ndarray:
+        origin = (int(origin[0]), int(origin[1]))
+        if origin not in self._fields:
+            walkable = self.walkable.copy()
+            # the origin may be a cell the player stands on which isn't walkable otherwise (e.g. a closed door)
+            walkable[origin] = True
+            self._fields[origin] = distance_field(walkable, self._doors, origin)
+        return self._fields[origin]
+
+    def distances(self, origin: Tuple[int, int], kind: str = "monsters", metric: str = "chebyshev") -> ndarray:
+        """
+        Distances from origin to every member of kind, -1 for members which can't be reached.
+        """
+        positions = self.positions(kind)
+        if metric == "chebyshev":
+            return np.abs(positions - np.asarray(origin)).max(axis=1, initial=0)
+        elif metric == "path":
+            return self.distance_field(origin)[positions[:, 0], positions[:, 1]].astype(np.int64)
+        raise ValueError(f"Unknown metric {metric}")
+
+    def nearest(
+        self,
+        origin: Tuple[int, int],
+        k: int = 1,
+        kind: str = "monsters",
+        metric: str = "chebyshev",
+        where: Optional[ndarray] = None,
+    ) -> Tuple[ndarray, ndarray]:
+        """
+        Indices of the k nearest members of kind and their distances, ties keep the row-major order.
+        `where` is a boolean mask over the members, e.g. entity_table["pet"] == False.
+        """
+        distances = self.distances(origin, kind, metric)
+        candidates = np.flatnonzero(distances >= 0)
+        if where is not None:
+            candidates = candidates[where[candidates]]
+        order = candidates[np.argsort(distances[candidates], kind="stable")][:k]
+        return order, distances[order]
+
+    def within(
+        self,
+        origin: Tuple[int, int],
+        radius: int,
+        kind: str = "monsters",
+        metric: str = "chebyshev",
+        where: Optional[ndarray] = None,
+    ) -> ndarray:
+        """
+        Indices of the members of kind within radius of origin, in row-major order.
+        """
+        if metric == "chebyshev":
+            y, x = int(origin[0]), int(origin[1])
+            window = self.grid(kind)[max(y - radius, 0) : y + radius + 1, max(x - radius, 0) : x + radius + 1]
+            indices = np.sort(window[window >= 0])
+        else:
+            distances = self.distances(origin, kind, metric)
+            indices = np.flatnonzero((distances >= 0) & (distances <= radius))
+        if where is not None:
+            indices = indices[where[indices]]
+        return indices
+
+    def adjacent(self, origin: Tuple[int, int], kind: str = "objects") -> ndarray:
+        """
+        Indices of the members of kind on origin and the 8 cells around it.
+        """
+        return self.within(origin, 1, kind)
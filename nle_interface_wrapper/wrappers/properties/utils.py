@@ -1,7 +1,7 @@
 import functools
 import importlib
 from itertools import chain
-from typing import Any, Callable, Generator, Iterator, List, Tuple, Union
+from typing import Any, Callable, Dict, Generator, Iterator, List, Optional, Sequence, Tuple, Union
 
 import numba as nb
 import numpy as np
@@ -10,21 +10,72 @@ from numpy import int64, ndarray
 # general Python utilities
 
 
-@nb.njit("b1[:,:](i2[:,:],i2,i2,b1[:])", cache=True)
-def _isin_kernel(array, mi, ma, mask):
-    ret = np.zeros(array.shape, dtype=nb.b1)
+@nb.njit("void(i2[:,:],i2,i2,b1[:],b1[:,:])", cache=True)
+def _isin_kernel(array, mi, ma, mask, out):
     for y in range(array.shape[0]):
         for x in range(array.shape[1]):
             if array[y, x] < mi or array[y, x] > ma:
-                continue
-            ret[y, x] = mask[array[y, x] - mi]
-    return ret
+                out[y, x] = False
+            else:
+                out[y, x] = mask[array[y, x] - mi]
+
+
+@nb.njit("void(i2[:,:],i2,i2,b1[:,:],b1[:,:,:])", cache=True)
+def _isin_many_kernel(array, mi, ma, masks, out):
+    for y in range(array.shape[0]):
+        for x in range(array.shape[1]):
+            if array[y, x] < mi or array[y, x] > ma:
+                for k in range(masks.shape[1]):
+                    out[k, y, x] = False
+            else:
+                for k in range(masks.shape[1]):
+                    out[k, y, x] = masks[array[y, x] - mi, k]
+
+
+@nb.njit("b1(i2[:,:],i2,i2,b1[:])", cache=True)
+def _any_in_kernel(array, mi, ma, mask):
+    for y in range(array.shape[0]):
+        for x in range(array.shape[1]):
+            if mi <= array[y, x] <= ma and mask[array[y, x] - mi]:
+                return True
+    return False
+
+
+class IsinMask:
+    """
+    Normalized lookup of a union of glyph sets, pass it to isin instead of the sets to skip the normalization.
+    """
+
+    __slots__ = ("mi", "ma", "mask")
+
+    def __init__(self, mi: int, ma: int, mask: ndarray):
+        self.mi = mi
+        self.ma = ma
+        self.mask = mask
+
+
+def _normalize(elems) -> Tuple:
+    # for memoization
+    return tuple(
+        (
+            (
+                e
+                if isinstance(e, tuple)
+                else (
+                    e
+                    if isinstance(e, frozenset)
+                    else tuple(e) if isinstance(e, list) else frozenset(e) if isinstance(e, set) else e
+                )
+            )
+            for e in elems
+        )
+    )
 
 
 @functools.lru_cache(1024)
-def _isin_mask(elems: Any) -> Tuple[int, int, ndarray]:
+def _isin_mask(elems: Any) -> IsinMask:
     elems = np.array(list(chain(*elems)), np.int16)
-    return _isin_mask_kernel(elems)
+    return IsinMask(*_isin_mask_kernel(elems))
 
 
 @nb.njit("Tuple((i2,i2,b1[:]))(i2[:])", cache=True)
@@ -42,32 +93,78 @@ def _isin_mask_kernel(elems):
     return mi, ma, ret
 
 
-def isin(array: ndarray, *elems) -> ndarray:
+# handles of single glyph sets registered with isin_mask, found without normalizing the set
+_REGISTERED: Dict[frozenset, IsinMask] = {}
+
+
+def isin_mask(*elems) -> IsinMask:
+    """
+    Pre-registers the union of elems, e.g. FLOOR_MASK = isin_mask(G.FLOOR, G.DOORS) at import time.
+    A single registered frozenset (e.g. G.FLOOR) also uses its handle when it's passed to isin directly.
+    """
+    handle = _isin_mask(_normalize(elems))
+    if len(elems) == 1 and isinstance(elems[0], frozenset):
+        _REGISTERED[elems[0]] = handle
+    return handle
+
+
+def _handle(elems: Tuple) -> IsinMask:
+    if len(elems) == 1:
+        if isinstance(elems[0], IsinMask):
+            return elems[0]
+        if isinstance(elems[0], frozenset) and elems[0] in _REGISTERED:
+            return _REGISTERED[elems[0]]
+    return _isin_mask(_normalize(elems))
+
+
+def isin(array: ndarray, *elems, out: Optional[ndarray] = None) -> ndarray:
+    """
+    Mask of the cells of array which are in any of elems, written to `out` when given.
+    elems can also be a single IsinMask handle.
+    """
     assert array.dtype == np.int16
 
-    # for memoization
-    elems = tuple(
-        (
-            (
-                e
-                if isinstance(e, tuple)
-                else (
-                    e
-                    if isinstance(e, frozenset)
-                    else tuple(e) if isinstance(e, list) else frozenset(e) if isinstance(e, set) else e
-                )
-            )
-            for e in elems
-        )
-    )
+    handle = _handle(elems)
+    if out is None:
+        out = np.empty(array.shape, dtype=bool)
+    _isin_kernel(array, handle.mi, handle.ma, handle.mask, out)
+    return out
+
+
+@functools.lru_cache(256)
+def _isin_many_mask(sets: Tuple) -> Tuple[int, int, ndarray]:
+    handles = [_handle((s,)) for s in sets]
+    mi = min(handle.mi for handle in handles)
+    ma = max(handle.ma for handle in handles)
+    # (glyph, set) layout, so the flags of one glyph are next to each other
+    masks = np.zeros((ma - mi + 1, len(handles)), bool)
+    for k, handle in enumerate(handles):
+        masks[handle.mi - mi : handle.ma - mi + 1, k] = handle.mask
+    return mi, ma, masks
+
+
+def isin_many(array: ndarray, sets: Sequence, out: Optional[ndarray] = None) -> ndarray:
+    """
+    Stacked (len(sets), *array.shape) masks, one per set, computed in a single pass over array.
+    """
+    assert array.dtype == np.int16
+
+    sets = tuple(s if isinstance(s, IsinMask) else _normalize((s,))[0] for s in sets)
+    mi, ma, masks = _isin_many_mask(sets)
 
-    mi, ma, mask = _isin_mask(elems)
-    return _isin_kernel(array, mi, ma, mask)
+    if out is None:
+        out = np.empty((len(sets), *array.shape), dtype=bool)
+    _isin_many_kernel(array, mi, ma, masks, out)
+    return out
 
 
-def any_in(array, *elems):
-    # TODO: optimize
-    return isin(array, *elems).any()
+def any_in(array, *elems) -> bool:
+    """
+    Whether any cell of array is in elems, stops at the first one.
+    """
+    assert array.dtype == np.int16
+    handle = _handle(elems)
+    return _any_in_kernel(array, handle.mi, handle.ma, handle.mask)
 
 
 def infinite_iterator(func: Callable[[Any], Generator]) -> Iterator:
@@ -81,7 +178,7 @@ def infinite_iterator(func: Callable[[Any], Generator]) -> Iterator:
         yield data
 
 
-def coords(glyphs: ndarray, obj: frozenset) -> List[Union[Any, Tuple[int64, int64]]]:
+def coords(glyphs: ndarray, obj: Union[frozenset, IsinMask]) -> List[Union[Any, Tuple[int64, int64]]]:
     return list(zip(*isin(glyphs, obj).nonzero()))
 
 
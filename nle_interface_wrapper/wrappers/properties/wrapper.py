@@ -1,21 +1,52 @@
-from typing import Any, List, Tuple, Union
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
 
 import gymnasium as gym
 import numpy as np
-from nle import nethack
 
-from nle_interface_wrapper.wrappers.properties.blstats import BLStats
-from nle_interface_wrapper.wrappers.properties.entity import Entity
-from nle_interface_wrapper.wrappers.properties.glyph import G
-from nle_interface_wrapper.wrappers.properties.utils import isin
+from nle_interface_wrapper.wrappers.properties.blstats import BLStats, decode_conditions
+from nle_interface_wrapper.wrappers.properties.category import GC, classify, has
+from nle_interface_wrapper.wrappers.properties.entity import Entity, entity_table
+from nle_interface_wrapper.wrappers.properties.intrinsics import Intrinsics
+from nle_interface_wrapper.wrappers.properties.message_events import MESSAGE_EVENTS
+from nle_interface_wrapper.wrappers.properties.spatial import SpatialIndex
+
+
+def _condition(name: str, doc: str) -> property:
+    return property(lambda self: self.conditions[name], doc=doc)
+
+
+class derived:
+    """
+    Field computed from the observation on first access and memoized until the next Properties.update.
+    The value is stored in the instance dict, so later accesses in the same step are plain attribute lookups.
+    """
+
+    def __init__(self, compute: Callable[["Properties"], Any]):
+        self.compute = compute
+        self.__doc__ = compute.__doc__
+
+    def __set_name__(self, owner, name: str):
+        self.name = name
+        owner.DERIVED_FIELDS = (*getattr(owner, "DERIVED_FIELDS", ()), name)
+
+    def __get__(self, obj, objtype=None):
+        if obj is None:
+            return self
+        obj.field_usage[self.name] += 1
+        value = obj.__dict__[self.name] = self.compute(obj)
+        return value
 
 
 class Properties(gym.Wrapper):
     def __init__(self, env: gym.Env):
         super().__init__(env)
+        # number of steps in which every derived field was used, compare with num_updates
+        self.field_usage = Counter()
+        self.num_updates = 0
 
     def reset(self, **kwargs):
-        self.is_lycanthrope = False
+        self.intrinsics = Intrinsics()
 
         self.obs, self.info = self.env.reset(**kwargs)
         self.last_obs = self.obs
@@ -41,25 +72,31 @@ class Properties(gym.Wrapper):
         self.in_getlin = internal[2]
         self.xwaitingforspace = internal[3]
 
-        self.blstats = self.get_blstats(self.obs)
-        self.glyphs = self.get_glyphs(self.obs)
+        # derived fields of the previous observation
+        for name in self.DERIVED_FIELDS:
+            self.__dict__.pop(name, None)
+        self.num_updates += 1
+
         self.message = self.get_message(self.obs)
-        self.tty_chars = self.get_tty_chars(self.obs)
-        self.tty_colors = self.get_tty_colors(self.obs)
-        self.cursor = self.get_cursor(self.obs)
-        self.entity = self.get_entity(self.obs)
-        self.entities = self.get_entities(self.obs)
+        self.message_events = MESSAGE_EVENTS.scan(self.message)
 
-        if "You feel feverish." in self.message:
-            self.is_lycanthrope = True
-        if "You feel purified." in self.message:
-            self.is_lycanthrope = False
+        if self.message_events:
+            self.intrinsics.update(self.message_events, self.blstats.time)
+
+    def prime(self, **fields):
+        """
+        Sets derived fields of the current step which were computed elsewhere, e.g. by BatchedProperties.
+        Call it after update, which drops the derived fields of the previous step.
+        """
+        for name, value in fields.items():
+            assert name in self.DERIVED_FIELDS, name
+            self.__dict__[name] = value
 
     def add_message(self, message):
         self.obs["text_message"] += "\n" + message
 
     def get_blstats(self, last_obs) -> BLStats:
-        return BLStats(*last_obs["blstats"])
+        return BLStats(last_obs["blstats"])
 
     def get_glyphs(self, last_obs):
         return last_obs["glyphs"]
@@ -85,90 +122,100 @@ class Properties(gym.Wrapper):
         position = (blstats.y, blstats.x)
         return Entity(position, self.get_glyphs(last_obs)[position])
 
-    def get_entities(self, last_obs) -> List[Union[Any, Entity]]:
+    def get_entity_table(self, last_obs, glyph_categories: Optional[np.ndarray] = None) -> np.ndarray:
         """
         Returns:
-            List of Entity objects with the monsters
+            ENTITY_DTYPE array with the monsters
         """
         glyphs = self.get_glyphs(last_obs)
         blstats = self.get_blstats(last_obs)
-        monster_mask = isin(glyphs, G.MONS, G.INVISIBLE_MON)
+        if glyph_categories is None:
+            glyph_categories = classify(glyphs)
+        monster_mask = has(glyph_categories, GC.MONS | GC.INVISIBLE_MON)
         monster_mask[blstats.y, blstats.x] = 0
 
-        return [Entity(position, glyphs[position]) for position in list(zip(*np.where(monster_mask)))]
-
-    @property
-    def lycantropy(self):
-        return self.is_lycanthrope
+        return entity_table(glyphs, monster_mask)
 
-    @property
-    def engulfed(self):
-        return isin(self.glyphs, G.SWALLOW).any()
+    def get_entities(self, last_obs) -> List[Union[Any, Entity]]:
+        """
+        Returns:
+            List of Entity objects with the monsters
+        """
+        return [Entity.from_table(row) for row in self.get_entity_table(last_obs)]
 
-    @property
-    def stone(self):
-        """Stoned"""
-        return True if self.blstats.prop_mask & nethack.BL_MASK_STONE else False
+    @derived
+    def blstats(self) -> BLStats:
+        return self.get_blstats(self.obs)
 
-    @property
-    def slime(self):
-        """Slimed"""
-        return True if self.blstats.prop_mask & nethack.BL_MASK_SLIME else False
+    @derived
+    def glyphs(self) -> np.ndarray:
+        return self.get_glyphs(self.obs)
 
-    @property
-    def strngl(self):
-        """Strangled"""
-        return True if self.blstats.prop_mask & nethack.BL_MASK_STRNGL else False
+    @derived
+    def glyph_categories(self) -> np.ndarray:
+        return classify(self.glyphs)
 
-    @property
-    def foodpois(self):
-        """Food Poisoning"""
-        return True if self.blstats.prop_mask & nethack.BL_MASK_FOODPOIS else False
+    @derived
+    def tty_chars(self) -> np.ndarray:
+        return self.get_tty_chars(self.obs)
 
-    @property
-    def termill(self):
-        """Terminally Ill"""
-        return True if self.blstats.prop_mask & nethack.BL_MASK_TERMILL else False
+    @derived
+    def tty_colors(self) -> np.ndarray:
+        return self.get_tty_colors(self.obs)
 
-    @property
-    def blind(self):
-        """Blind"""
-        return True if self.blstats.prop_mask & nethack.BL_MASK_BLIND else False
+    @derived
+    def cursor(self) -> Tuple[int, int]:
+        return self.get_cursor(self.obs)
 
-    @property
-    def deaf(self):
-        """Deaf"""
-        return True if self.blstats.prop_mask & nethack.BL_MASK_DEAF else False
+    @derived
+    def entity(self) -> Entity:
+        return self.get_entity(self.obs)
 
-    @property
-    def stun(self):
-        """Stunned"""
-        return True if self.blstats.prop_mask & nethack.BL_MASK_STUN else False
+    @derived
+    def entity_table(self) -> np.ndarray:
+        return self.get_entity_table(self.obs, self.glyph_categories)
 
-    @property
-    def conf(self):
-        """Confused"""
-        return True if self.blstats.prop_mask & nethack.BL_MASK_CONF else False
+    @derived
+    def entities(self) -> List[Union[Any, Entity]]:
+        """
+        Entity views of the entity table.
+        """
+        return [Entity.from_table(row) for row in self.entity_table]
 
-    @property
-    def hallu(self):
-        """Hallucinating"""
-        return True if self.blstats.prop_mask & nethack.BL_MASK_HALLU else False
+    @derived
+    def spatial_index(self) -> SpatialIndex:
+        return SpatialIndex(self.glyph_categories, self.entity_table)
 
     @property
-    def lev(self):
-        """Levitating"""
-        return True if self.blstats.prop_mask & nethack.BL_MASK_LEV else False
+    def lycantropy(self):
+        return self.is_lycanthrope
 
     @property
-    def fly(self):
-        """Flying"""
-        return True if self.blstats.prop_mask & nethack.BL_MASK_FLY else False
+    def is_lycanthrope(self):
+        return self.intrinsics.has("lycanthropy")
 
     @property
-    def ride(self):
-        """Riding"""
-        return True if self.blstats.prop_mask & nethack.BL_MASK_RIDE else False
+    def engulfed(self):
+        return has(self.glyph_categories, GC.SWALLOW).any()
+
+    stone = _condition("stone", "Stoned")
+    slime = _condition("slime", "Slimed")
+    strngl = _condition("strngl", "Strangled")
+    foodpois = _condition("foodpois", "Food Poisoning")
+    termill = _condition("termill", "Terminally Ill")
+    blind = _condition("blind", "Blind")
+    deaf = _condition("deaf", "Deaf")
+    stun = _condition("stun", "Stunned")
+    conf = _condition("conf", "Confused")
+    hallu = _condition("hallu", "Hallucinating")
+    lev = _condition("lev", "Levitating")
+    fly = _condition("fly", "Flying")
+    ride = _condition("ride", "Riding")
+
+    @derived
+    def conditions(self) -> Dict[str, bool]:
+        """All status conditions, decoded from prop_mask at once"""
+        return {name: bool(flag) for name, flag in decode_conditions(self.blstats.prop_mask).items()}
 
     @property
     def poly(self):
@@ -0,0 +1,109 @@
+import os
+import queue
+import threading
+import time
+from collections import defaultdict
+from typing import Optional, Sequence
+
+import gymnasium as gym
+import numpy as np
+
+
+class RecordTrajectory(gym.Wrapper):
+    """
+    Records what the agent saw: actions, rewards, text_* fields and optionally raw observation arrays.
+
+    Steps are collected into chunks of `chunk_size` steps, every chunk is written as a compressed .npz file
+    by a background thread. At most `queue_size` chunks wait for the writer, when the queue is full step
+    blocks until the writer catches up, so memory stays bounded.
+    """
+
+    def __init__(
+        self,
+        env,
+        savedir: str,
+        array_keys: Sequence[str] = (),
+        chunk_size: int = 1000,
+        queue_size: int = 8,
+        prefix: Optional[str] = None,
+    ):
+        super().__init__(env)
+        self.savedir = savedir
+        self.array_keys = tuple(array_keys)
+        self.chunk_size = chunk_size
+        self.prefix = prefix if prefix is not None else f"{time.strftime('%Y%m%d-%H%M%S')}_{os.getpid()}"
+        os.makedirs(self.savedir, exist_ok=True)
+
+        self.episode = -1
+        self.chunk_index = 0
+        self.chunk = defaultdict(list)
+
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.error = None
+        self.writer = threading.Thread(target=self.write_chunks, daemon=True)
+        self.writer.start()
+
+    def reset(self, **kwargs):
+        obs, info = self.env.reset(**kwargs)
+
+        self.flush()
+        self.episode += 1
+        self.chunk_index = 0
+        self.record(obs, -1, 0.0, False, False)
+
+        return obs, info
+
+    def step(self, action):
+        obs, reward, terminated, truncated, info = self.env.step(action)
+
+        self.record(obs, action, reward, terminated, truncated)
+        if terminated or truncated or len(self.chunk["action"]) >= self.chunk_size:
+            self.flush()
+
+        return obs, reward, terminated, truncated, info
+
+    def record(self, obs, action, reward, terminated, truncated):
+        self.chunk["action"].append(action)
+        self.chunk["reward"].append(reward)
+        self.chunk["terminated"].append(terminated)
+        self.chunk["truncated"].append(truncated)
+        for key, value in obs.items():
+            if key.startswith("text_"):
+                self.chunk[key].append(value)
+        for key in self.array_keys:
+            # nle reuses its observation buffers, so arrays have to be copied
+            self.chunk[key].append(np.array(obs[key]))
+
+    def flush(self):
+        if not self.chunk:
+            return
+
+        if self.error is not None:
+            raise self.error
+
+        path = os.path.join(self.savedir, f"{self.prefix}_{self.episode:06d}_{self.chunk_index:04d}.npz")
+        self.queue.put((path, self.chunk))
+        self.chunk = defaultdict(list)
+        self.chunk_index += 1
+
+    def write_chunks(self):
+        while True:
+            item = self.queue.get()
+            try:
+                if item is None:
+                    return
+                path, chunk = item
+                np.savez_compressed(path, **{key: np.array(values) for key, values in chunk.items()})
+            except Exception as e:
+                self.error = e
+            finally:
+                self.queue.task_done()
+
+    def close(self):
+        if self.writer.is_alive():
+            self.flush()
+            self.queue.put(None)
+            self.writer.join()
+        super().close()
+        if self.error is not None:
+            raise self.error
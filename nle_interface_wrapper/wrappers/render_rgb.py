@@ -0,0 +1,120 @@
+from typing import Optional
+
+import gymnasium as gym
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+# nethack colors (CLR_* from include/color.h), black is lifted to dark gray to stay visible
+PALETTE = np.array(
+    [
+        (64, 64, 64),  # black
+        (170, 0, 0),  # red
+        (0, 170, 0),  # green
+        (170, 85, 0),  # brown
+        (0, 0, 170),  # blue
+        (170, 0, 170),  # magenta
+        (0, 170, 170),  # cyan
+        (170, 170, 170),  # gray
+        (85, 85, 85),  # no color
+        (255, 85, 85),  # orange
+        (85, 255, 85),  # bright green
+        (255, 255, 85),  # yellow
+        (85, 85, 255),  # bright blue
+        (255, 85, 255),  # bright magenta
+        (85, 255, 255),  # bright cyan
+        (255, 255, 255),  # white
+    ],
+    dtype=np.uint8,
+)
+
+NUM_CHARS = 256
+
+
+class TTYRenderer:
+    """
+    Renders tty_chars/tty_colors to an RGB image.
+
+    Every (color, char) pair is drawn once into an atlas, each frame is then a single gather from the atlas.
+    """
+
+    def __init__(self, font_path: Optional[str] = None, font_size: int = 14, background=(0, 0, 0)):
+        if font_path is not None:
+            font = ImageFont.truetype(font_path, font_size)
+        else:
+            # the size argument is only understood by pillow>=10.1
+            try:
+                font = ImageFont.load_default(font_size)
+            except TypeError:
+                font = ImageFont.load_default()
+
+        masks = self.draw_chars(font)
+        _, self.cell_height, self.cell_width = masks.shape
+
+        background = np.array(background, dtype=np.float32)
+        alpha = masks[None, :, :, :, None].astype(np.float32) / 255.0
+        atlas = alpha * PALETTE[:, None, None, None, :] + (1.0 - alpha) * background
+        atlas = np.round(atlas).astype(np.uint8).reshape(len(PALETTE) * NUM_CHARS, self.cell_height, -1)
+
+        # one pixel row of a cell is a single element, so the gather below writes whole rows at once
+        row_dtype = np.dtype((np.void, self.cell_width * 3))
+        self.atlas = np.ascontiguousarray(atlas).view(row_dtype).reshape(len(PALETTE) * NUM_CHARS, self.cell_height)
+        self.rows = np.arange(self.cell_height)[None, :, None]
+
+        self.cursor_row = np.tile(PALETTE[7], self.cell_width)
+
+    @staticmethod
+    def draw_chars(font) -> np.ndarray:
+        """
+        Returns (NUM_CHARS, height, width) uint8 masks of all latin-1 characters drawn with the font.
+        """
+        chars = [chr(i) if chr(i).isprintable() else " " for i in range(NUM_CHARS)]
+
+        boxes = [font.getbbox(c) for c in chars]
+        width = max(max(box[2] for box in boxes), 1)
+        height = max(max(box[3] for box in boxes), 1)
+
+        masks = np.zeros((NUM_CHARS, height, width), np.uint8)
+        for i, c in enumerate(chars):
+            if c == " ":
+                continue
+            image = Image.new("L", (width, height), 0)
+            ImageDraw.Draw(image).text((0, 0), c, fill=255, font=font)
+            masks[i] = np.asarray(image)
+        return masks
+
+    def render(self, tty_chars: np.ndarray, tty_colors: np.ndarray, tty_cursor=None) -> np.ndarray:
+        """
+        Returns:
+            (rows * cell_height, columns * cell_width, 3) uint8 image
+        """
+        num_rows, num_cols = tty_chars.shape
+        index = (tty_colors.astype(np.intp) & 15) * NUM_CHARS + tty_chars
+        frame = self.atlas[index[:, None, :], self.rows]
+
+        if tty_cursor is not None:
+            y, x = tty_cursor
+            if 0 <= y < num_rows and 0 <= x < num_cols:
+                frame[y, -1, x] = self.cursor_row.view(frame.dtype)[0]
+
+        return frame.view(np.uint8).reshape(num_rows * self.cell_height, num_cols * self.cell_width, 3)
+
+
+class RenderRGBArray(gym.Wrapper):
+    def __init__(self, env, font_path: Optional[str] = None, font_size: int = 14):
+        super().__init__(env)
+        self.metadata = {
+            **env.metadata,
+            "render_modes": list(dict.fromkeys([*env.metadata.get("render_modes", []), "rgb_array"])),
+        }
+        self.renderer = TTYRenderer(font_path, font_size) if self.render_mode == "rgb_array" else None
+
+    def render(self):
+        if self.render_mode != "rgb_array":
+            return self.env.render()
+
+        env = self.env.unwrapped
+        obs = env.last_observation
+        tty_chars = obs[env._observation_keys.index("tty_chars")]
+        tty_colors = obs[env._observation_keys.index("tty_colors")]
+        tty_cursor = obs[env._observation_keys.index("tty_cursor")]
+        return self.renderer.render(tty_chars, tty_colors, tty_cursor)
@@ -0,0 +1,58 @@
+import copy
+from typing import Any, Callable, Optional
+
+import gymnasium as gym
+import numpy as np
+
+
+def states_equal(a: Any, b: Any) -> bool:
+    if isinstance(a, np.ndarray) or isinstance(b, np.ndarray):
+        return np.array_equal(a, b)
+    if isinstance(a, dict) and isinstance(b, dict):
+        return a.keys() == b.keys() and all(states_equal(a[key], b[key]) for key in a)
+    if isinstance(a, (list, tuple)) and isinstance(b, (list, tuple)):
+        return len(a) == len(b) and all(states_equal(x, y) for x, y in zip(a, b))
+    return a == b
+
+
+class ResetCache:
+    """
+    Post-reset state of wrappers which parse menus with hidden steps (skills, spells, overview, terrain).
+
+    Entries are keyed by (seed, character, options), so resetting to an already seen seed restores the parsed
+    state instead of replaying the keystrokes. With `validate` the hidden steps still run and the live parse
+    is checked against the cache.
+    """
+
+    def __init__(self, validate: bool = False):
+        self.validate = validate
+        self.entries = {}
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, env: gym.Env, seed: Optional[int]):
+        if seed is None:
+            return None
+        nle = env.unwrapped
+        return (seed, nle.character, tuple(nle.nethack.options))
+
+    def load(self, env: gym.Env, name: str, seed: Optional[int], parse: Callable[[], Any]) -> Any:
+        """
+        Returns the state `name` cached for this reset, `parse` runs the hidden steps and returns the live state.
+        """
+        key = self.key(env, seed)
+        if key is None:
+            return parse()
+
+        entry = self.entries.setdefault(key, {})
+        if name not in entry:
+            self.misses += 1
+            entry[name] = copy.deepcopy(parse())
+        else:
+            self.hits += 1
+            if self.validate:
+                live = parse()
+                if not states_equal(live, entry[name]):
+                    raise ValueError(f"Cached {name} state for {key} doesn't match the live parse")
+
+        return copy.deepcopy(entry[name])
@@ -1,20 +1,28 @@
 import re
+from typing import Optional
 
 import gymnasium as gym
 from nle.nethack import actions as A
 
+from nle_interface_wrapper.wrappers.reset_cache import ResetCache
 from nle_interface_wrapper.wrappers.skills.properties import Alignment, Gender, Race, Role
 from nle_interface_wrapper.wrappers.skills.skill import CharacterSkills
 
 
 class AddTextSkills(gym.Wrapper):
-    def __init__(self, env):
+    def __init__(self, env, reset_cache: Optional[ResetCache] = None):
         super().__init__(env)
+        self.reset_cache = reset_cache
 
     def reset(self, **kwargs):
         obs, info = self.env.reset(**kwargs)
 
-        self.update()
+        if self.reset_cache is not None:
+            welcome = self.reset_cache.load(self, "skills", kwargs.get("seed"), self.parse_initial_welcome)
+            self.race, self.gender, self.role, self.alignment = welcome
+            self.skill = CharacterSkills.from_role(self.role)
+        else:
+            self.update()
 
         return self.populate_obs(obs), info
 
@@ -34,6 +42,10 @@ class AddTextSkills(gym.Wrapper):
         self.parse_welcome(message)
         obs, *_ = self.env.step(self.env.actions.index(A.Command.ESC))
 
+    def parse_initial_welcome(self):
+        self.update()
+        return self.race, self.gender, self.role, self.alignment
+
     def parse_welcome(self, message):
         """
         parse agent gender, race, role, alignment form starting message
@@ -1,36 +1,44 @@
 import re
+from typing import Optional
 
 import gymnasium as gym
 from nle.nethack import actions as A
 
+from nle_interface_wrapper.wrappers.properties.message_events import MESSAGE_EVENTS
+from nle_interface_wrapper.wrappers.reset_cache import ResetCache
 from nle_interface_wrapper.wrappers.spells.spell import Spell
 
+MESSAGE_EVENTS.register(
+    "spell_learned",
+    r"(?:learn .+\."  # matches: learn <spell name>.
+    r"|add .+ to your repertoire\."  # matches: add <spell name> to your repertoire.
+    r"|Your knowledge of .+ is keener\."
+    r"|Your knowledge of .+ is restored\."
+    r"|You know .+ quite well already\.)",
+)
+
 
 class AddTextSpells(gym.Wrapper):
-    def __init__(self, env):
+    def __init__(self, env, reset_cache: Optional[ResetCache] = None):
         super().__init__(env)
+        self.reset_cache = reset_cache
 
     def reset(self, **kwargs):
         obs, info = self.env.reset(**kwargs)
 
-        self.update()
+        if self.reset_cache is not None:
+            self.known_spells = self.reset_cache.load(self, "spells", kwargs.get("seed"), self.parse_initial_spells)
+        else:
+            self.update()
 
         return self.populate_obs(obs), info
 
     def step(self, action):
         obs, reward, terminated, truncated, info = self.env.step(action)
 
-        success_regex = (
-            r"(?:learn .+\."  # matches: learn <spell name>.
-            r"|add .+ to your repertoire\."  # matches: add <spell name> to your repertoire.
-            r"|Your knowledge of .+ is keener\."
-            r"|Your knowledge of .+ is restored\."
-            r"|You know .+ quite well already\.)"
-        )
-
         # we should only update if we know that we have learned a new spell
-        if re.search(success_regex, self.message):
-            self.update(obs)
+        if not (terminated or truncated) and "spell_learned" in self.message_events:
+            self.update()
 
         return self.populate_obs(obs), reward, terminated, truncated, info
 
@@ -43,6 +51,10 @@ class AddTextSpells(gym.Wrapper):
         text = obs["text_message"]
         self.parse_spellcast_view(text)
 
+    def parse_initial_spells(self):
+        self.update()
+        return self.known_spells
+
     def parse_spellcast_view(self, text):
         # Pattern for spells
         spell_pattern = r"^([a-z])\s*-\s*([a-z ]+?)\s+(\d+)\s+([a-z]+)\s+(\d+)%\s+(\d+)%$"